@@ -0,0 +1,143 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "httpx", "gradio_client", "qrcode[pil]", "numpy" ]
+# ///
+
+import io
+import os
+import random
+import asyncio
+import hashlib
+import contextlib
+from pathlib import Path
+
+import httpx
+
+from ai_client import RetryableError, http_transport, REQUEST_TIMEOUT
+
+# Hugging Face Inference API (FREE!)
+HF_MODEL = "monster-labs/control_v1p_sd15_qrcode_monster"
+API_URL = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
+HF_TOKEN = os.getenv("HF_TOKEN", "")  # Optional: set HF_TOKEN env var for higher rate limits
+SPACE = "huggingface-projects/QR-code-AI-art-generator"
+
+class HttpBackend:
+    """The HF Inference API, or any endpoint speaking its JSON format (e.g. stub_inference_server.py)."""
+
+    name = "hf"
+    concurrency = 4
+    rate = 0.5
+
+    def __init__(self, api_url=API_URL, token=HF_TOKEN):
+        self.api_url = api_url
+        self.model = HF_MODEL if api_url == API_URL else api_url
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    def request(self, prompt, content, seed):
+        return {
+            "inputs": f"{prompt}, QR code, scannable",
+            "parameters": {
+                "qr_code_content": content,
+                "num_inference_steps": 30,
+                "guidance_scale": 7.5,
+                "controlnet_conditioning_scale": 1.5,
+                "seed": seed
+            }
+        }
+
+    @contextlib.asynccontextmanager
+    async def connect(self, concurrency):
+        """Yields call(job) -> bytes over one shared client, so connections are reused."""
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, limits=limits) as client:
+            yield http_transport(client, self.api_url, self.headers)
+
+class GradioBackend:
+    """The QR-code-AI-art-generator Space through gradio_client."""
+
+    name = "gradio"
+    concurrency = 2
+    rate = 0.33
+
+    def __init__(self, space=SPACE):
+        self.model = space
+
+    def request(self, prompt, content, seed):
+        return {
+            "qr_code_content": content,
+            "prompt": f"{prompt}, artistic QR code, high quality",
+            "negative_prompt": "ugly, blurry, low quality, disfigured",
+            "guidance_scale": 10,
+            "controlnet_conditioning_scale": 2,
+            "strength": 0.9,
+            "seed": seed,
+            "init_image": None,
+            "qrcode_image": None,
+            "use_qr_code_as_init_image": True,
+            "sampler": "DPM++ Karras SDE",
+        }
+
+    @contextlib.asynccontextmanager
+    async def connect(self, concurrency):
+        """
+        Yields call(job) -> bytes around the blocking Client.predict, run in threads.
+        The Space reports queue and quota errors as plain exceptions, so all are retried.
+        """
+        from gradio_client import Client
+
+        # Connect to HuggingFace Space once; the client reuses its connection
+        client = await asyncio.to_thread(Client, self.model)
+
+        async def call(job):
+            try:
+                result = await asyncio.to_thread(client.predict, **job["request"], api_name="/inference")
+            except Exception as e:
+                raise RetryableError(str(e)[:70])
+            # Result is a file path
+            if not result or not Path(result).exists():
+                raise RuntimeError("No result returned")
+            return Path(result).read_bytes()
+
+        yield call
+
+class StubBackend:
+    """
+    Local and deterministic: draws a styled QR code whose drawer, gradient and palette
+    are picked from the prompt and seed. For exercising the pipeline without a network.
+    """
+
+    name = "stub"
+    concurrency = 4
+    rate = 1000.0
+
+    def __init__(self):
+        self.model = "qr_engine"
+
+    def request(self, prompt, content, seed):
+        return {"prompt": prompt, "qr_code_content": content, "seed": seed}
+
+    @staticmethod
+    def render(request):
+        from qr_engine import DRAWERS, MASKS, PALETTES, make_variant, encode, render_image
+
+        digest = hashlib.sha256(f"{request['prompt']}\0{request['seed']}".encode('utf-8')).digest()
+        rng = random.Random(digest)
+        palette = rng.choice(PALETTES)
+        variant = make_variant("stub.png", rng.choice(list(DRAWERS)), rng.choice(list(MASKS)),
+                               palette["c1"], palette["c2"])
+        buffer = io.BytesIO()
+        render_image(encode(request["qr_code_content"]), variant).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    @contextlib.asynccontextmanager
+    async def connect(self, concurrency):
+        async def call(job):
+            return await asyncio.to_thread(self.render, job["request"])
+
+        yield call
+
+BACKENDS = {
+    "hf": HttpBackend,
+    "gradio": GradioBackend,
+    "stub": StubBackend,
+}
@@ -0,0 +1,280 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "httpx" ]
+# ///
+
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 2.0   # Seconds before the first retry, doubled per attempt
+BACKOFF_MAX = 120.0
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = 300.0  # Image generation can take minutes on a cold model
+CACHE_DIR = os.path.join('.build-cache', 'ai')
+
+class RetryableError(Exception):
+    """A failure worth retrying; retry_after is the server's requested delay in seconds, if any."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average with bursts of up to `capacity`.
+    hold() stops every caller until a server-requested Retry-After has passed.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.held_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def hold(self, seconds):
+        self.held_until = max(self.held_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.held_until:
+                    await asyncio.sleep(self.held_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class Journal:
+    """
+    Append-only JSON-lines record of finished jobs. Every line is flushed to disk as
+    soon as a job ends, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.entries = {}
+        if restart and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from an interrupted write
+                    self.entries[entry["id"]] = entry
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def is_done(self, job):
+        entry = self.entries.get(job["id"])
+        return bool(entry and entry["status"] == "done" and os.path.exists(job["output"]))
+
+    def record(self, job, status, **fields):
+        entry = {"id": job["id"], "output": job["output"], "status": status, "time": time.time(), **fields}
+        self.entries[job["id"]] = entry
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+class ResponseCache:
+    """
+    Content-addressed store of generated images. Entries are keyed by job id, which
+    covers the backend, model and the full request (prompt, seed, guidance and
+    conditioning parameters), so any change to those is a miss. Counts hits and
+    misses for this run and accumulates them in stats.json.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, job):
+        return os.path.join(self.directory, job["id"][:2], f"{job['id']}.png")
+
+    def get(self, job):
+        path = self.path(job)
+        if os.path.exists(path):
+            self.hits += 1
+            with open(path, 'rb') as f:
+                return f.read()
+        self.misses += 1
+        return None
+
+    def put(self, job, data):
+        os.makedirs(os.path.dirname(self.path(job)), exist_ok=True)
+        write_atomic(self.path(job), data)
+
+    def stats(self):
+        """This run's and the accumulated hit counts, plus the cache's entry count and size."""
+        stats_file = os.path.join(self.directory, 'stats.json')
+        total = {"hits": 0, "misses": 0}
+        if os.path.exists(stats_file):
+            with open(stats_file, 'r', encoding='utf-8') as f:
+                total = json.load(f)
+        entries = size = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.png'):
+                    entries += 1
+                    size += os.path.getsize(os.path.join(root, name))
+        run = {"hits": self.hits, "misses": self.misses}
+        total = {"hits": total["hits"] + self.hits, "misses": total["misses"] + self.misses}
+        if self.hits or self.misses:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(stats_file, 'w', encoding='utf-8') as f:
+                json.dump(total, f)
+
+        def rate(counts):
+            lookups = counts["hits"] + counts["misses"]
+            return counts["hits"] / lookups if lookups else 0.0
+
+        return {"run": {**run, "hit_rate": rate(run)}, "total": {**total, "hit_rate": rate(total)},
+                "entries": entries, "bytes": size}
+
+def make_job(output, request, transport):
+    """Describes one generation request; its id covers the transport and the full request."""
+    digest = hashlib.sha256(json.dumps([transport, request], sort_keys=True).encode('utf-8')).hexdigest()
+    return {"id": digest, "output": str(output), "request": request}
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def retry_after(response):
+    """Seconds the server asked us to wait: Retry-After (seconds or HTTP date), else HF's estimated_time."""
+    value = response.headers.get('Retry-After')
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    if response.status_code == 503:
+        try:
+            return float(response.json()["estimated_time"])
+        except (ValueError, KeyError, TypeError):
+            pass
+    return None
+
+def http_transport(client, api_url, headers=None):
+    """Returns a call(job) -> bytes that POSTs the job's request over a shared httpx.AsyncClient."""
+
+    async def call(job):
+        try:
+            response = await client.post(api_url, headers=headers, json=job["request"])
+        except httpx.TransportError as e:
+            raise RetryableError(f"{type(e).__name__}: {e}")
+        if response.status_code == 200:
+            return response.content
+        if response.status_code in RETRY_STATUSES:
+            raise RetryableError(f"HTTP {response.status_code}", retry_after(response))
+        raise RuntimeError(f"HTTP {response.status_code} - {response.text[:100]}")
+
+    return call
+
+def write_atomic(path, data):
+    """Writes bytes to path through a temporary file so a crash never leaves a partial image."""
+    temp = f"{path}.tmp"
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, path)
+
+async def run_jobs(jobs, call, journal, concurrency=4, rate=0.5, burst=1, max_attempts=MAX_ATTEMPTS,
+                   cache=None):
+    """
+    Runs every job through call(job) -> image bytes with at most `concurrency` in
+    flight, starting no more than `rate` requests per second. Retryable failures back
+    off exponentially, or for as long as the server's Retry-After asks, which then
+    holds back every worker. Jobs found in the response cache are written out without
+    a request; without a cache, jobs the journal records as done are skipped.
+    Returns the list of per-job result dicts.
+    """
+    bucket = TokenBucket(rate, burst)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        name = os.path.basename(job["output"])
+        # The cache goes first: another backend may have written the same output file since
+        cached = cache.get(job) if cache else None
+        if cached is not None:
+            write_atomic(job["output"], cached)
+            journal.record(job, "done", cached=True)
+            return {"output": job["output"], "status": "cached", "seconds": 0.0}
+        if journal.is_done(job):
+            return {"output": job["output"], "status": "skipped", "seconds": 0.0}
+        async with semaphore:
+            # Timed from here so the reported seconds exclude waiting for a slot
+            start = time.perf_counter()
+            error = None
+            for attempt in range(max_attempts):
+                await bucket.acquire()
+                try:
+                    data = await call(job)
+                except RetryableError as e:
+                    error = str(e)
+                    if e.retry_after is not None:
+                        delay = e.retry_after
+                        bucket.hold(delay)
+                    else:
+                        delay = backoff_delay(attempt)
+                    if attempt == max_attempts - 1:
+                        continue  # No attempt left to wait for; the loop's else gives up
+                    print(f"   [RETRY] {name}: {error}, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                except Exception as e:
+                    error = str(e)
+                    break
+                write_atomic(job["output"], data)
+                if cache:
+                    cache.put(job, data)
+                seconds = time.perf_counter() - start
+                journal.record(job, "done", attempts=attempt + 1, seconds=round(seconds, 2))
+                print(f"   [OK] Saved: {name} ({seconds:.1f}s)")
+                return {"output": job["output"], "status": "generated", "seconds": seconds}
+            else:
+                error = f"gave up after {max_attempts} attempts ({error})"
+            journal.record(job, "failed", error=error)
+            print(f"   [FAIL] {name}: {error}")
+            return {"output": job["output"], "status": "failed", "seconds": time.perf_counter() - start,
+                    "error": error}
+
+    return await asyncio.gather(*(run(job) for job in jobs))
+
+def print_summary(results, elapsed, cache=None):
+    """Prints generated/cached/skipped/failed totals and the cache's hit rate."""
+    counts = {"generated": 0, "cached": 0, "skipped": 0, "failed": 0}
+    for r in results:
+        counts[r["status"]] += 1
+    print(f"\nDone in {elapsed:.1f}s: {counts['generated']} generated, {counts['cached']} from cache, "
+          f"{counts['skipped']} already done, {counts['failed']} failed.")
+    if cache:
+        print_cache_stats(cache.stats())
+    return counts
+
+def print_cache_stats(stats):
+    run, total = stats["run"], stats["total"]
+    print(f"Cache: {run['hits']} hit(s), {run['misses']} miss(es) this run ({run['hit_rate']:.0%}); "
+          f"{total['hit_rate']:.0%} over {total['hits'] + total['misses']} lookups; "
+          f"{stats['entries']} image(s), {stats['bytes'] / 1024 / 1024:.1f} MB")
@@ -0,0 +1,223 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "PyYAML", "Pillow", "qrcode[pil]", "numpy" ]
+# ///
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+
+from PIL import Image
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SIZES = (100, 5000, 50000)
+RESIZE_LIMIT = 200      # Raw photos per catalog for the resize phases; they are large to synthesize
+IMAGES_PER_COLLECTION = 100
+LARGE_COLLECTION_SHARE = 0.1  # One collection holds this share of the images, as a catch-all would
+THUMB_SIZES = ((640, 480), (480, 640), (600, 600))
+RAW_SIZES = ((2400, 1800), (1800, 2400))
+TEMPLATES = 6           # Distinct pictures per size; copies are made unique with trailing bytes
+REPORT_FILE = "bench-results.json"
+REPORT_VERSION = 1
+# Copied into each catalog so the build renders index.html and sw.js as it does for the site
+SITE_FILES = ("site.yaml", "index.template.html", "sw.template.js", "css/style.css", "js/app.js")
+
+# Phases run in order, each in a fresh interpreter so peak memory is measured independently
+BUILD_PHASES = ("build-cold", "build-warm", "build-rescan")
+RESIZE_PHASES = ("resize-cold", "resize-warm")
+QR_PHASES = ("qr-cold", "qr-warm")
+
+def template_jpegs(sizes, seed):
+    """Encodes a few gradient-and-noise pictures per size; returns the JPEG bytes."""
+    rng = random.Random(seed)
+    templates = []
+    for width, height in sizes:
+        for _ in range(TEMPLATES):
+            gradient = Image.linear_gradient('L').resize((width, height))
+            noise = Image.effect_noise((width, height), rng.uniform(20, 60))
+            color = tuple(rng.randrange(256) for _ in range(3))
+            img = Image.merge('RGB', (gradient, noise, Image.new('L', (width, height), color[2])))
+            buffer = io.BytesIO()
+            img.save(buffer, 'JPEG', quality=85)
+            templates.append(buffer.getvalue())
+    return templates
+
+def write_unique(path, template, n):
+    """Writes a template JPEG with a unique trailer, so every file has its own content hash."""
+    with open(path, 'wb') as f:
+        f.write(template)
+        f.write(f"bench-{n}".encode('ascii'))
+
+def synthesize_catalog(root, size, seed=2025):
+    """
+    Creates root/images with `size` images: one large collection plus collections of
+    IMAGES_PER_COLLECTION, two thirds numbered and one third unnumbered, most with a
+    _collection.info; root/raw with up to RESIZE_LIMIT full-size photos; and SITE_FILES.
+    """
+    rng = random.Random(seed)
+    thumbs = template_jpegs(THUMB_SIZES, seed)
+    large = int(size * LARGE_COLLECTION_SHARE)
+    counts = [large] if large > IMAGES_PER_COLLECTION else []
+    remaining = size - sum(counts)
+    counts += [IMAGES_PER_COLLECTION] * (remaining // IMAGES_PER_COLLECTION)
+    if remaining % IMAGES_PER_COLLECTION:
+        counts.append(remaining % IMAGES_PER_COLLECTION)
+
+    written = 0
+    for c, count in enumerate(counts):
+        folder = f"{c + 1}_collection_{c:04d}" if c % 3 else f"collection_{c:04d}"
+        collection_dir = os.path.join(root, 'images', folder)
+        os.makedirs(collection_dir)
+        if c % 5:
+            with open(os.path.join(collection_dir, '_collection.info'), 'w', encoding='utf-8') as f:
+                f.write(f"Synthetic collection {c}.\n\n" + "Lorem ipsum dolor sit amet. " * rng.randint(5, 40))
+        for _ in range(count):
+            write_unique(os.path.join(collection_dir, f"painting-{written:06d}.jpg"), rng.choice(thumbs), written)
+            written += 1
+
+    raw_dir = os.path.join(root, 'raw')
+    os.makedirs(raw_dir)
+    raws = template_jpegs(RAW_SIZES, seed)
+    for i in range(min(size, RESIZE_LIMIT)):
+        write_unique(os.path.join(raw_dir, f"IMG_{i:06d}.jpg"), rng.choice(raws), i)
+
+    for file in SITE_FILES:
+        os.makedirs(os.path.join(root, os.path.dirname(file)), exist_ok=True)
+        shutil.copy(file, os.path.join(root, file))
+    return {"images": written, "collections": len(counts), "raw": min(size, RESIZE_LIMIT)}
+
+def peak_rss_mb():
+    """
+    This process's peak resident set size in MB. Prefers VmHWM, because ru_maxrss
+    carries the parent's peak over fork and exec on Linux.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def peak_children_rss_mb():
+    """Peak resident set size of the largest finished child process (pool workers), in MB."""
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_phase(phase, root, workers):
+    """Runs one phase inside root with its output silenced; returns timing and peak memory."""
+    os.chdir(root)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        if phase.startswith('build'):
+            import build
+            build.run_build(force=phase == 'build-rescan')
+            with open(build.OUTPUT_FILE, 'r', encoding='utf-8') as f:
+                items = sum(len(c["paintings"]) for c in json.load(f).values())
+        elif phase.startswith('resize'):
+            import process_images
+            items = len(process_images.resize_images('raw', 'resized', workers=workers))
+        else:
+            import qr_engine
+            from generate_40_qr import plan_variants, DEFAULT_SEED
+            variants = plan_variants(DEFAULT_SEED)
+            qr_engine.render_variants(variants, 'qr', seed=DEFAULT_SEED, workers=workers)
+            items = len(variants)
+        seconds = time.perf_counter() - start
+    return {"phase": phase, "items": items, "seconds": round(seconds, 3),
+            "items_per_second": round(items / seconds, 1) if seconds else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1), "peak_worker_rss_mb": round(peak_children_rss_mb(), 1)}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline_file):
+    """Prints each phase's wall time against a previous report."""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    before = {(r["size"], r["phase"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline_file} (commit {baseline.get('commit')}):")
+    for r in report["results"]:
+        old = before.get((r["size"], r["phase"]))
+        if old:
+            ratio = r["seconds"] / old["seconds"] if old["seconds"] else float('nan')
+            flag = "  <-- slower" if ratio > 1.2 else ""
+            print(f"  {r['size']:>6} {r['phase']:<13} {old['seconds']:>8.2f}s -> {r['seconds']:>8.2f}s ({ratio:.2f}x){flag}")
+
+def run_benchmark(sizes=SIZES, workers=None, report_file=REPORT_FILE, baseline=None, workdir=None):
+    """
+    Synthesizes a catalog per size and times every phase in it, then writes the
+    results with the commit and machine details to report_file.
+    """
+    report = {"version": REPORT_VERSION, "commit": git_commit(), "python": platform.python_version(),
+              "platform": platform.platform(), "cpu_count": os.cpu_count(), "time": time.time(), "results": []}
+    base = workdir or tempfile.mkdtemp(prefix='bench-catalog-')
+    try:
+        for n, size in enumerate(sizes):
+            root = os.path.join(base, f"catalog-{size}")
+            shutil.rmtree(root, ignore_errors=True)
+            start = time.perf_counter()
+            catalog = synthesize_catalog(root, size)
+            print(f"\nCatalog of {catalog['images']} images in {catalog['collections']} collections "
+                  f"({catalog['raw']} raw) synthesized in {time.perf_counter() - start:.1f}s")
+            # QR rendering does not depend on catalog size, so it only runs in the first catalog
+            phases = BUILD_PHASES + RESIZE_PHASES + (QR_PHASES if n == 0 else ())
+            for phase in phases:
+                args = [sys.executable, os.path.abspath(__file__), '--child', phase, root]
+                if workers:
+                    args.append(str(workers))
+                result = json.loads(subprocess.run(args, check=True, capture_output=True, text=True).stdout)
+                result["size"] = size
+                report["results"].append(result)
+                print(f"  {phase:<13} {result['items']:>6} items {result['seconds']:>8.2f}s "
+                      f"{result['items_per_second'] or 0:>9.1f}/s  peak {result['peak_rss_mb']:>6.0f}MB "
+                      f"(workers {result['peak_worker_rss_mb']:.0f}MB)")
+    finally:
+        if not workdir:
+            shutil.rmtree(base, ignore_errors=True)
+
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    print(f"\nResults written to {report_file}.")
+    if baseline:
+        compare(report, baseline)
+    return report
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 4 and sys.argv[1] == '--child':
+        workers = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        print(json.dumps(run_phase(sys.argv[2], sys.argv[3], workers)))
+        sys.exit()
+
+    parser = argparse.ArgumentParser(description="Benchmark build, resize and QR rendering on synthetic catalogs.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="catalog sizes in images (default: %(default)s)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--output', default=REPORT_FILE, help="results file (default: %(default)s)")
+    parser.add_argument('--compare', metavar='REPORT', help="print wall-time ratios against an earlier results file")
+    parser.add_argument('--workdir', help="keep the synthesized catalogs in this directory instead of a temporary one")
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.workers, args.output, args.compare, args.workdir)
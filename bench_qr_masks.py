@@ -0,0 +1,67 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "qrcode[pil]", "numpy" ]
+# ///
+
+import time
+import argparse
+
+import numpy as np
+import qrcode
+from qrcode.image.styledpil import StyledPilImage
+from qrcode.image.styles.moduledrawers.pil import RoundedModuleDrawer
+from qrcode.image.styles.colormasks import (
+    SquareGradiantColorMask,
+    RadialGradiantColorMask,
+    HorizontalGradiantColorMask,
+    VerticalGradiantColorMask
+)
+
+from qr_engine import URL
+from qr_masks import (
+    FastSquareGradiantColorMask,
+    FastRadialGradiantColorMask,
+    FastHorizontalGradiantColorMask,
+    FastVerticalGradiantColorMask
+)
+
+C1, C2 = (88, 86, 214), (33, 150, 243)
+
+# name: (original mask, vectorized mask, color keywords)
+GRADIENTS = {
+    "Radial": (RadialGradiantColorMask, FastRadialGradiantColorMask, ("center_color", "edge_color")),
+    "Square": (SquareGradiantColorMask, FastSquareGradiantColorMask, ("center_color", "edge_color")),
+    "Horizontal": (HorizontalGradiantColorMask, FastHorizontalGradiantColorMask, ("left_color", "right_color")),
+    "Vertical": (VerticalGradiantColorMask, FastVerticalGradiantColorMask, ("top_color", "bottom_color")),
+}
+
+def render(qr, mask_class, keywords):
+    """Renders the QR with one mask and returns (seconds, pixel array)."""
+    mask = mask_class(back_color=(255, 255, 255), **dict(zip(keywords, (C1, C2))))
+    start = time.perf_counter()
+    img = qr.make_image(image_factory=StyledPilImage, module_drawer=RoundedModuleDrawer(), color_mask=mask)
+    return time.perf_counter() - start, np.array(img.get_image())
+
+def run_benchmark(box_size):
+    """Times original vs vectorized masks for each gradient type and checks the outputs match."""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H, box_size=box_size)
+    qr.add_data(URL)
+    qr.make()
+    print(f"Gradient masks at box_size={box_size} ({qr.modules_count + 2 * qr.border} modules, "
+          f"{(qr.modules_count + 2 * qr.border) * box_size}px square)\n")
+    print(f"{'gradient':<12} {'original':>10} {'vectorized':>11} {'speedup':>8} {'max diff':>9}")
+    mismatches = 0
+    for name, (original, fast, keywords) in GRADIENTS.items():
+        slow_time, slow_pixels = render(qr, original, keywords)
+        fast_time, fast_pixels = render(qr, fast, keywords)
+        diff = int(np.abs(slow_pixels.astype(int) - fast_pixels.astype(int)).max())
+        mismatches += diff > 0
+        print(f"{name:<12} {slow_time:>9.2f}s {fast_time:>10.3f}s {slow_time / fast_time:>7.0f}x {diff:>9}")
+    print("\nAll outputs pixel-identical." if not mismatches else f"\n{mismatches} gradient(s) differ!")
+    return mismatches
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare original and vectorized QR gradient masks.")
+    parser.add_argument('--box-size', type=int, default=40, help="pixels per module (default: %(default)s)")
+    args = parser.parse_args()
+    raise SystemExit(1 if run_benchmark(args.box_size) else 0)
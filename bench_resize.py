@@ -0,0 +1,67 @@
+# /// script
+# dependencies = [
+#   "Pillow",
+# ]
+# ///
+
+import os
+import sys
+import json
+import glob
+import time
+import tempfile
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from process_images import resize_one, MAX_WIDTH, JPEG_QUALITY
+
+BENCH_DIR = 'images_raw/Studio sale 2'
+
+def peak_rss_mb():
+    """Returns this process's peak resident set size in MB (NaN where unsupported)."""
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_mode(draft):
+    """Resizes every benchmark image serially in this process and returns timing and peak RSS."""
+    image_paths = sorted(glob.glob(os.path.join(BENCH_DIR, '**', '*.jpg'), recursive=True))
+    params = {"max_width": MAX_WIDTH, "quality": JPEG_QUALITY, "draft": draft}
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as output_dir:
+        results = [resize_one(p, os.path.join(output_dir, os.path.basename(p)), params) for p in image_paths]
+    return {
+        "mode": "draft" if draft else "full-decode",
+        "images": len(image_paths),
+        "failed": sum(r["status"] == "failed" for r in results),
+        "seconds": time.perf_counter() - start,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def run_benchmark():
+    """Runs each decode mode in a fresh interpreter so peak RSS is measured independently."""
+    print(f"Benchmarking resize of '{BENCH_DIR}' to {MAX_WIDTH}px...")
+    rows = []
+    for mode in ('full', 'draft'):
+        out = subprocess.run([sys.executable, __file__, '--child', mode],
+                             check=True, capture_output=True, text=True).stdout
+        rows.append(json.loads(out))
+
+    print(f"\n{'mode':<12} {'images':>6} {'wall time':>10} {'peak RSS':>10}")
+    for r in rows:
+        print(f"{r['mode']:<12} {r['images']:>6} {r['seconds']:>9.2f}s {r['peak_rss_mb']:>8.0f}MB")
+    full, draft = rows
+    print(f"\nReduced-scale decode: {full['seconds'] / draft['seconds']:.1f}x faster, "
+          f"{full['peak_rss_mb'] / draft['peak_rss_mb']:.1f}x less peak memory.")
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        print(json.dumps(run_mode(sys.argv[2] == 'draft')))
+    else:
+        run_benchmark()
@@ -1,17 +1,64 @@
 # /// script
 # requires-python = ">=3.11"
-# dependencies = [ "PyYAML" ]
+# dependencies = [ "PyYAML", "Pillow", "numpy>=2.0" ]
 # ///
 
 import os
+import io
+import re
+import html
 import json
+import time
+import base64
+import filecmp
+import hashlib
+import argparse
+import tempfile
+import threading
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from string import Template
 import yaml
+from PIL import Image, ImageOps
+
+import timing
+from timing import tracer
+from process_images import is_image_name
 
 IMAGES_DIR = Path('images')
 OUTPUT_FILE = Path('gallery-data.json')
 SITE_CONFIG_FILE = Path('site.yaml')
 SITE_OUTPUT_FILE = Path('site-data.json')
+CACHE_DIR = Path('.build-cache')
+MANIFEST_FILE = CACHE_DIR / 'build-manifest.json'
+MANIFEST_VERSION = 2
+INTRINSICS_FILE = CACHE_DIR / 'intrinsics.json'
+INTRINSICS_VERSION = 1
+LQIP_SIZE = 16
+SCAN_THREADS = 8  # Collections fingerprinted and scanned at once; stat() and hashing release the GIL
+DERIVED_MANIFEST_FILE = Path('derived/manifest.json')
+PAGE_DIR = Path('gallery')
+INDEX_TEMPLATE_FILE = Path('index.template.html')
+INDEX_FILE = Path('index.html')
+ATLAS_MAP_FILE = Path('derived/atlas/atlas.json')
+# Rendered tile width for each breakpoint, matching the .gallery-grid columns in css/style.css
+GRID_SIZES = '(max-width: 768px) calc(100vw - 3rem), (max-width: 1200px) 50vw, 33vw'
+PREFERRED_FORMATS = ('avif', 'webp')
+GRID_CHUNK = 24   # Tiles per .gallery-grid block; off-screen blocks skip rendering (content-visibility)
+INLINE_TILES = 48  # Tiles in index.html, in display order; app.js pages the rest in from PAGE_DIR
+PAGE_GRIDS = 4    # Blocks per page file, so each request adds at most this much to the DOM
+EAGER_TILES = 6   # Leading tiles loaded without loading="lazy", as they are likely above the fold
+SEARCH_INDEX_FILE = Path('search-index.json')
+SW_TEMPLATE_FILE = Path('sw.template.js')
+SW_FILE = Path('sw.js')
+# Precached by the service worker on install; './' is the page itself
+SW_SHELL = ('./', 'css/style.css', 'js/app.js', 'site-data.json', 'gallery-data.json', 'search-index.json')
+SEARCH_INDEX_VERSION = 1
+SEARCH_STOPWORDS = frozenset("a an and are as at be by for from in is it of on or the this to with".split())
+COMBINING_MARKS = re.compile('[\u0300-\u036f]')  # Stripped after NFKD, as in js/app.js
+PRICE_PATTERN = re.compile(r'\d[\d,]*(?:\.\d+)?')
+EMAIL_PATTERN = re.compile(r'([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+\.[a-zA-Z0-9_-]+)')
 
 def parse_collection_prefix(folder_name):
     """
@@ -19,7 +66,6 @@ def parse_collection_prefix(folder_name):
     Returns (prefix_number, clean_name) or (None, folder_name)
     Example: "2_back_to_the_garden" -> (2, "back_to_the_garden")
     """
-    import re
     match = re.match(r'^(\d+)_(.+)$', folder_name)
     if match:
         prefix_num = int(match.group(1))
@@ -45,6 +91,11 @@ def format_collection_name(name):
     _, clean_name = parse_collection_prefix(name)
     return clean_name.replace('_', ' ').replace('-', ' ').title()
 
+def list_collections():
+    """The collection directories in IMAGES_DIR, in display order."""
+    with os.scandir(IMAGES_DIR) as entries:
+        return sorted((Path(entry.path) for entry in entries if entry.is_dir()), key=collection_sort_key)
+
 def get_existing_data():
     """Loads the existing gallery data if it exists."""
     if OUTPUT_FILE.exists():
@@ -52,84 +103,664 @@ def get_existing_data():
             return json.load(f)
     return {}
 
-def run_build():
-    """Scans the images directory and generates a JSON data file for the gallery."""
-    print("Starting build...")
+def file_sha256(path):
+    """Returns the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-    # --- Process site config ---
-    if SITE_CONFIG_FILE.exists():
-        print(f"Processing site config from {SITE_CONFIG_FILE}...")
-        with open(SITE_CONFIG_FILE, 'r', encoding='utf-8') as f:
-            site_data = yaml.safe_load(f)
-        with open(SITE_OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(site_data, f, indent=4)
+def fingerprint_file(path, previous=None):
+    """
+    Returns a fingerprint dict (mtime_ns, size, sha256) for a file (a Path or os.DirEntry).
+    The content hash is only recomputed when mtime or size differ from
+    the previous fingerprint, so unchanged files cost a single stat().
+    """
+    stat = path.stat()
+    if previous and previous.get("mtime_ns") == stat.st_mtime_ns and previous.get("size") == stat.st_size:
+        return previous
+    return {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": file_sha256(path)
+    }
+
+def fingerprint_collection(collection_dir, previous_files=None):
+    """
+    Fingerprints the images and _collection.info of a collection directory.
+    Returns (files, digest) where files is keyed by name in sorted order and
+    digest only depends on file names and contents.
+    """
+    previous_files = previous_files or {}
+    files = {}
+    with os.scandir(collection_dir) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        if not entry.is_file():
+            continue
+        if entry.name != '_collection.info' and not is_image_name(entry.name):
+            continue
+        files[entry.name] = fingerprint_file(entry, previous_files.get(entry.name))
+
+    digest = hashlib.sha256()
+    for name, entry in files.items():
+        digest.update(f"{name}\0{entry['sha256']}\n".encode('utf-8'))
+    return files, digest.hexdigest()
+
+def load_manifest():
+    """Loads the build manifest, or returns an empty one if missing or outdated."""
+    if MANIFEST_FILE.exists():
+        try:
+            with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+    return {"version": MANIFEST_VERSION, "site": None, "collections": {}}
+
+def save_manifest(manifest):
+    """Writes the build manifest to the cache directory."""
+    CACHE_DIR.mkdir(exist_ok=True)
+    # Compact and in one piece: json.dumps() then uses the C encoder, which matters at 100k files
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(manifest, separators=(',', ':'), sort_keys=True))
+
+def load_derivatives():
+    """
+    Loads the responsive derivative manifest written by process_images.py --derivatives,
+    grouped by collection folder name: {folder: {relative_path: entry}}.
+    """
+    grouped = {}
+    if DERIVED_MANIFEST_FILE.exists():
+        with open(DERIVED_MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            for relative_path, entry in json.load(f).items():
+                folder = relative_path.split('/', 1)[0]
+                grouped.setdefault(folder, {})[relative_path] = entry
+    return grouped
+
+def apply_derivatives(collection_data, derivatives):
+    """Records the responsive variants (file, format, width, height, bytes) of each painting."""
+    for painting in collection_data["paintings"]:
+        entry = derivatives.get(painting["file"])
+        if entry:
+            painting["variants"] = entry["variants"]
+        else:
+            painting.pop("variants", None)
+
+def read_intrinsics(path):
+    """
+    Returns pixel dimensions, aspect ratio, dominant color and a tiny base64 WebP
+    placeholder for an image. Dimensions come from the header alone; JPEG pixels
+    are decoded at 1/8 scale via draft() for the color and placeholder.
+    """
+    with Image.open(path) as img:
+        width, height = img.size
+        if img.getexif().get(0x0112) in (5, 6, 7, 8):
+            width, height = height, width
+        img.draft('RGB', (LQIP_SIZE * 4, LQIP_SIZE * 4))
+        small = ImageOps.exif_transpose(img).convert('RGB')
+    small.thumbnail((LQIP_SIZE * 4, LQIP_SIZE * 4))
+
+    # Most common color of a 5-color palette, rather than the (muddy) mean
+    quantized = small.quantize(colors=5)
+    _, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+
+    small.thumbnail((LQIP_SIZE, LQIP_SIZE))
+    buffer = io.BytesIO()
+    small.save(buffer, 'WEBP', quality=40)
+    return {
+        "width": width,
+        "height": height,
+        "aspect": round(width / height, 4),
+        "color": f"#{r:02x}{g:02x}{b:02x}",
+        "lqip": "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode('ascii')
+    }
+
+def load_intrinsics():
+    """Loads the intrinsics cache ({sha256: intrinsics}), or an empty one if missing or outdated."""
+    if INTRINSICS_FILE.exists():
+        try:
+            with open(INTRINSICS_FILE, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get("version") == INTRINSICS_VERSION:
+                return cache
+        except (OSError, ValueError):
+            pass
+    return {"version": INTRINSICS_VERSION, "images": {}}
+
+def save_intrinsics(cache):
+    """Writes the intrinsics cache to the cache directory."""
+    CACHE_DIR.mkdir(exist_ok=True)
+    with open(INTRINSICS_FILE, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(cache, separators=(',', ':')))
+
+def apply_intrinsics(collection_data, collection_dir, files, cache, log=print):
+    """
+    Records width, height, aspect, color and lqip on each painting, reading
+    images only when their content hash is not in the intrinsics cache yet.
+    Warnings go to log.
+    """
+    for painting in collection_data["paintings"]:
+        name = painting["file"].split('/', 1)[1]
+        sha256 = files[name]["sha256"]
+        if sha256 not in cache["images"]:
+            try:
+                cache["images"][sha256] = read_intrinsics(collection_dir / name)
+            except OSError as e:
+                log(f"  Warning: could not read {painting['file']}: {e}")
+                continue
+        painting.update(cache["images"][sha256])
+
+def write_if_changed(path, text):
+    """Writes text to path unless the file already has exactly that content. Returns True if written."""
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return True
+
+def write_json_if_changed(path, data, indent=None):
+    """
+    Streams data as JSON into a temporary file next to path, then atomically replaces
+    path with it, so the document is never held in memory as one string and readers
+    never see a partial file. Leaves path untouched if it already holds exactly that
+    JSON. Returns True if written.
+    """
+    mode = path.stat().st_mode & 0o777 if path.exists() else 0o644
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with open(fd, 'w', encoding='utf-8') as f:
+            f.writelines(json.JSONEncoder(indent=indent, ensure_ascii=False).iterencode(data))
+        if path.exists() and filecmp.cmp(temp_path, path, shallow=False):
+            os.remove(temp_path)
+            return False
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+        return True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def scan_collection(collection_dir, collection_title, existing_data, image_names, log=print):
+    """
+    Builds a collection's data from its directory and image file names, merging
+    in any existing painting data. Newly added images are reported to log.
+    """
+    collection_name_str = collection_dir.name
+
+    # Read collection description
+    info_file = collection_dir / '_collection.info'
+    description = ""
+    if info_file.exists():
+        with open(info_file, 'r', encoding='utf-8') as f:
+            description = f.read().strip()
+
+    # Prepare collection data structure
+    collection_data = {
+        "description": description,
+        "paintings": []
+    }
+
+    # Existing data by file, so each image's record is found without a search
+    existing_paintings = {p.get("file"): p for p in existing_data.get(collection_title, {}).get("paintings", [])}
+
+    for img_filename in image_names:
+        relative_path = f"{collection_name_str}/{img_filename}"
+        existing_painting_data = existing_paintings.get(relative_path)
+
+        if existing_painting_data:
+            # Preserve existing data
+            collection_data["paintings"].append(existing_painting_data)
+        else:
+            # Add new image with placeholder data
+            log(f"  Adding new image: {img_filename}")
+            collection_data["paintings"].append({
+                "file": relative_path,
+                "title": f"{os.path.splitext(img_filename)[0].replace('_', ' ').replace('-', ' ').title()}",
+                "meta": "Medium, Size",
+                "price": "$TBD"
+            })
+
+    return collection_data
+
+def assign_flat_indexes(gallery_data):
+    """
+    Stores each collection's offset and each painting's index in the flat,
+    collection-ordered painting list, so app.js never has to search for them.
+    Returns True if any stored value changed.
+    """
+    changed = False
+    offset = 0
+    for collection in gallery_data.values():
+        if collection.get("offset") != offset:
+            collection["offset"] = offset
+            changed = True
+        for painting in collection["paintings"]:
+            if painting.get("index") != offset:
+                painting["index"] = offset
+                changed = True
+            offset += 1
+    return changed
+
+def tokenize(text):
+    """
+    Lower-cased, accent-stripped alphanumeric words of two or more characters, minus
+    stopwords. js/app.js tokenizes search queries the same way.
+    """
+    text = str(text).lower()
+    if not text.isascii():
+        text = COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text))
+    return {t for t in re.findall(r'[a-z0-9]+', text) if len(t) > 1 and t not in SEARCH_STOPWORDS}
+
+def parse_price(price):
+    """The amount in a price string ("$1,200" -> 1200), or None for prices like "$TBD"."""
+    match = PRICE_PATTERN.search(str(price or ""))
+    if not match:
+        return None
+    amount = float(match.group().replace(',', ''))
+    return int(amount) if amount.is_integer() else amount
+
+def is_sold(painting):
+    """A painting is sold if it has a truthy "sold" field or its price says so."""
+    return bool(painting.get("sold")) or "sold" in str(painting.get("price", "")).lower()
+
+def build_search_index(gallery_data):
+    """
+    The search and filter index read by app.js, everything keyed by flat painting index:
+    sorted terms with the paintings whose title or meta contain them and the collections
+    whose title or description do (as [offset, count] ranges), paintings ordered by
+    price with the matching prices, and the paintings that are still available.
+    """
+    painting_terms = {}
+    collection_terms = {}
+    collections = []
+    priced = []
+    available = []
+    for c, (title, collection) in enumerate(gallery_data.items()):
+        collections.append([collection["offset"], len(collection["paintings"])])
+        for term in tokenize(title) | tokenize(collection.get("description", "")):
+            collection_terms.setdefault(term, []).append(c)
+        for painting in collection["paintings"]:
+            index = painting["index"]
+            for term in tokenize(painting.get("title", "")) | tokenize(painting.get("meta", "")):
+                painting_terms.setdefault(term, []).append(index)
+            price = parse_price(painting.get("price"))
+            if price is not None:
+                priced.append((price, index))
+            if not is_sold(painting):
+                available.append(index)
+
+    terms = sorted(painting_terms.keys() | collection_terms.keys())
+    priced.sort()
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "count": sum(count for _, count in collections),
+        "terms": terms,
+        "postings": [painting_terms.get(term, []) for term in terms],
+        "collection_postings": [collection_terms.get(term, []) for term in terms],
+        "collections": collections,
+        "by_price": [index for _, index in priced],
+        "prices": [price for price, _ in priced],
+        "available": available
+    }
+
+def compact_json(data):
+    """Serializes data without whitespace, for files that are only read by app.js."""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+def load_atlas_tiles():
+    """
+    Loads the atlas map written by process_images.py --atlas as
+    {relative_path: (sheet, x, y, w, h)}, or {} if there is none.
+    """
+    tiles = {}
+    if ATLAS_MAP_FILE.exists():
+        with open(ATLAS_MAP_FILE, 'r', encoding='utf-8') as f:
+            for collection in json.load(f)["collections"].values():
+                for relative_path, (sheet, x, y, w, h) in collection["tiles"].items():
+                    tiles[relative_path] = (collection["sheets"][sheet], x, y, w, h)
+    return tiles
+
+def srcset(painting, fmt):
+    return ', '.join(f"{v['file']} {v['width']}w" for v in painting.get("variants", []) if v["format"] == fmt)
+
+def render_sprite(painting, tile):
+    """A tile cut from an atlas sheet: the sheet is scaled so one tile spans the element, then positioned."""
+    sheet, x, y, w, h = tile
+    px = 0 if sheet["width"] == w else x / (sheet["width"] - w) * 100
+    py = 0 if sheet["height"] == h else y / (sheet["height"] - h) * 100
+    style = (f"aspect-ratio:{w} / {h};background-image:url('{sheet['file']}');"
+             f"background-size:{sheet['width'] / w * 100:.4g}% {sheet['height'] / h * 100:.4g}%;"
+             f"background-position:{px:.4g}% {py:.4g}%")
+    return f'<div class="gallery-sprite" role="img" aria-label="{html.escape(painting["title"])}" style="{html.escape(style)}"></div>'
+
+def render_picture(painting, eager):
+    """A <picture> with AVIF/WebP sources and a JPEG srcset when derivatives exist."""
+    sources = ''.join(f'<source type="image/{fmt}" srcset="{html.escape(srcset(painting, fmt))}" sizes="{GRID_SIZES}">'
+                      for fmt in PREFERRED_FORMATS if srcset(painting, fmt))
+    attributes = f'src="{html.escape("images/" + painting["file"])}" alt="{html.escape(painting["title"])}"'
+    if painting.get("variants"):
+        attributes += f' srcset="{html.escape(srcset(painting, "jpeg"))}" sizes="{GRID_SIZES}"'
+    if painting.get("width") and painting.get("height"):
+        # Intrinsic size lets the browser reserve the tile before the image loads
+        attributes += f' width="{painting["width"]}" height="{painting["height"]}"'
+    attributes += ' decoding="async"' if eager else ' loading="lazy" decoding="async"'
+    return f'<picture>{sources}<img {attributes}></picture>'
+
+def render_tile(painting, atlas_tiles, eager):
+    """
+    One gallery tile: a link to the full image (so it works without JS) that
+    app.js turns into a lightbox trigger. Atlas tiles carry their srcsets as
+    data attributes, since they have no <picture> for the lightbox to read.
+    """
+    style = []
+    # Dominant color and blurred preview show until the real image arrives
+    if painting.get("color"):
+        style.append(f"background-color:{painting['color']}")
+    if painting.get("lqip"):
+        style.append(f"background-image:url('{painting['lqip']}')")
+    attributes = f'class="gallery-item" href="{html.escape("images/" + painting["file"])}" data-index="{painting.get("index", 0)}"'
+    if style:
+        attributes += f' style="{html.escape(";".join(style))}"'
+    tile = atlas_tiles.get(painting["file"])
+    if tile:
+        for fmt in PREFERRED_FORMATS + ('jpeg',):
+            if srcset(painting, fmt):
+                attributes += f' data-{fmt}="{html.escape(srcset(painting, fmt))}"'
+        return f'<a {attributes}>{render_sprite(painting, tile)}</a>'
+    return f'<a {attributes}>{render_picture(painting, eager)}</a>'
+
+def render_gallery(gallery_data, atlas_tiles):
+    """
+    The #gallery markup: per collection a title, its description and its tiles in
+    GRID_CHUNK blocks. Blocks that would take the page past INLINE_TILES, and all
+    after them, go to pages of PAGE_GRIDS blocks instead, each with a .gallery-more
+    placeholder app.js loads it into. Returns (markup, pages) with pages
+    {page file: [block markup]}.
+    """
+    parts = []
+    pages = {}
+    rendered = 0
+    inline = True
+    for title, collection in gallery_data.items():
+        parts.append(f'<h2 class="collection-title">{html.escape(title)}</h2>')
+        if collection.get("description"):
+            parts.append(f'<p class="collection-description">{html.escape(collection["description"])}</p>')
+        parts.append('<div class="gallery-collection">')
+        paintings = collection["paintings"]
+        paged = []
+        for start in range(0, len(paintings), GRID_CHUNK):
+            block = paintings[start:start + GRID_CHUNK]
+            tiles = []
+            for painting in block:
+                tiles.append(render_tile(painting, atlas_tiles, rendered < EAGER_TILES))
+                rendered += 1
+            markup = f'<div class="gallery-grid">{"".join(tiles)}</div>'
+            inline = inline and rendered <= INLINE_TILES
+            if inline:
+                parts.append(markup)
+            else:
+                paged.append((markup, block))
+        folder = paintings[0]["file"].split('/', 1)[0] if paintings else None
+        for number, first in enumerate(range(0, len(paged), PAGE_GRIDS), 1):
+            group = paged[first:first + PAGE_GRIDS]
+            page_file = (PAGE_DIR / f"{folder}-{number}.json").as_posix()
+            count = sum(len(block) for _, block in group)
+            pages[page_file] = [markup for markup, _ in group]
+            parts.append(f'<div class="gallery-more" data-page="{html.escape(page_file)}" '
+                         f'data-collection="{html.escape(folder)}" data-offset="{group[0][1][0].get("index", 0)}" '
+                         f'data-count="{count}" style="--rows:{-(-count // 3)}"></div>')
+        parts.append('</div>')
+    return '\n'.join(parts), pages
+
+def write_pages(pages):
+    """
+    Writes each paged collection's remaining blocks to its PAGE_DIR file and removes
+    the pages of collections that are now rendered whole. Returns how many were written.
+    """
+    written = 0
+    if pages:
+        PAGE_DIR.mkdir(exist_ok=True)
+    for page_file, blocks in pages.items():
+        written += write_if_changed(Path(page_file), compact_json({"grids": blocks}))
+    if PAGE_DIR.exists():
+        for page_file in PAGE_DIR.glob('*.json'):
+            if page_file.as_posix() not in pages:
+                page_file.unlink()
+    return written
+
+def write_index(gallery_data):
+    """
+    Renders index.html from index.template.html, site-data.json and the gallery data,
+    so the page is complete without JS up to INLINE_TILES tiles; the rest are written
+    as pages. Returns True if index.html was written.
+    """
+    if not INDEX_TEMPLATE_FILE.exists():
+        print(f"Warning: '{INDEX_TEMPLATE_FILE}' not found, '{INDEX_FILE}' not rendered.")
+        return False
+    site_data = {}
+    if SITE_OUTPUT_FILE.exists():
+        with open(SITE_OUTPUT_FILE, 'r', encoding='utf-8') as f:
+            site_data = json.load(f)
+    fields = {key: html.escape(str(site_data.get(key, ""))) for key in
+              ("artist_name", "contact_email", "intro_title", "intro_subtitle", "location", "date", "time", "note")}
+    fields["title"] = f"{fields['artist_name']} - {fields['intro_subtitle']}"
+    # Email addresses in the note become mailto links
+    fields["note"] = EMAIL_PATTERN.sub(r'<a href="mailto:\1">\1</a>', fields["note"])
+    fields["gallery"], pages = render_gallery(gallery_data, load_atlas_tiles())
+    fields["total"] = sum(len(collection["paintings"]) for collection in gallery_data.values())
+    written = write_pages(pages)
+    if written:
+        print(f"{written} gallery page(s) written to '{PAGE_DIR}/'.")
+
+    with open(INDEX_TEMPLATE_FILE, 'r', encoding='utf-8') as f:
+        page = Template(f.read()).substitute(fields)
+    if write_if_changed(INDEX_FILE, page):
+        print(f"Page rendered to '{INDEX_FILE}'.")
+        return True
+    return False
+
+def write_service_worker():
+    """
+    Renders sw.js from sw.template.js. Its cache version hashes the app shell files,
+    so browsers install a new worker (and drop the old shell cache) whenever the page,
+    styles, script or data change. Returns True if sw.js was written.
+    """
+    if not SW_TEMPLATE_FILE.exists():
+        print(f"Warning: '{SW_TEMPLATE_FILE}' not found, '{SW_FILE}' not rendered.")
+        return False
+    digest = hashlib.sha256()
+    for path in SW_SHELL:
+        path = INDEX_FILE if path == './' else Path(path)
+        if path.exists():
+            digest.update(path.read_bytes())
+    fields = {"version": digest.hexdigest()[:16], "shell": json.dumps(list(SW_SHELL))}
+
+    with open(SW_TEMPLATE_FILE, 'r', encoding='utf-8') as f:
+        worker = Template(f.read()).substitute(fields)
+    if write_if_changed(SW_FILE, worker):
+        print(f"Service worker rendered to '{SW_FILE}'.")
+        return True
+    return False
+
+def build_site_data(manifest, force=False):
+    """Converts site.yaml to site-data.json, skipping the work if site.yaml is unchanged."""
+    if not SITE_CONFIG_FILE.exists():
+        print(f"Warning: '{SITE_CONFIG_FILE}' not found.")
+        return
+
+    fingerprint = fingerprint_file(SITE_CONFIG_FILE, manifest.get("site"))
+    previous = manifest.get("site") or {}
+    if not force and SITE_OUTPUT_FILE.exists() and fingerprint["sha256"] == previous.get("sha256"):
+        manifest["site"] = fingerprint
+        print(f"Site config unchanged, skipping '{SITE_OUTPUT_FILE}'.")
+        return
+
+    print(f"Processing site config from {SITE_CONFIG_FILE}...")
+    with open(SITE_CONFIG_FILE, 'r', encoding='utf-8') as f:
+        site_data = yaml.safe_load(f)
+    if write_if_changed(SITE_OUTPUT_FILE, json.dumps(site_data, indent=4)):
         print(f"Site data written to '{SITE_OUTPUT_FILE}'.")
     else:
-        print(f"Warning: '{SITE_CONFIG_FILE}' not found.")
+        print(f"Site data unchanged in '{SITE_OUTPUT_FILE}'.")
+    manifest["site"] = fingerprint
+
+def build_collection(collection_dir, collection_title, previous, existing_data, derivatives, intrinsics, force):
+    """
+    Fingerprints one collection and rescans it unless its files and derivatives match
+    its previous manifest record. Runs in a scan thread; returns a result dict with
+    the new manifest record, the collection data, bytes hashed, timing and the
+    messages to print, which the caller prints in display order.
+    """
+    start = time.perf_counter()
+    messages = []
+    previous_files = previous.get("files") or {}
+    files, digest = fingerprint_collection(collection_dir, previous_files)
+    # Only files whose stat changed were read for hashing
+    hashed = sum(entry["size"] for name, entry in files.items() if entry is not previous_files.get(name))
+    derived_digest = hashlib.sha256(json.dumps(derivatives, sort_keys=True).encode('utf-8')).hexdigest()
+    record = {"title": collection_title, "digest": digest, "derived": derived_digest, "files": files}
+
+    if (not force and previous.get("digest") == digest and previous.get("derived") == derived_digest
+            and collection_title in existing_data):
+        return {"record": record, "data": existing_data[collection_title], "status": "unchanged",
+                "started": start, "seconds": time.perf_counter() - start, "bytes_read": hashed,
+                "tid": threading.get_native_id(), "messages": messages}
+
+    messages.append(f"Processing collection: {collection_title}...")
+    image_names = [name for name in files if name != '_collection.info']
+    collection_data = scan_collection(collection_dir, collection_title, existing_data, image_names, messages.append)
+    apply_intrinsics(collection_data, collection_dir, files, intrinsics, messages.append)
+    apply_derivatives(collection_data, derivatives)
+    return {"record": record, "data": collection_data, "status": "scanned",
+            "started": start, "seconds": time.perf_counter() - start, "bytes_read": hashed,
+            "tid": threading.get_native_id(), "messages": messages}
+
+def run_inline(func, *args):
+    """Calls func(*args) in this thread and returns its outcome as a completed Future."""
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def run_build(force=False, collections_to_check=None, site=True, duplicates=None):
+    """
+    Scans the images directory and generates a JSON data file for the gallery,
+    then renders it with the site config into index.html.
+    Collections whose fingerprint matches the build manifest are copied from the
+    existing gallery data without being re-scanned; pass force=True to rebuild all.
+    collections_to_check limits fingerprinting to the given folder names (used by
+    watch.py, which already knows what changed); site=False skips site.yaml.
+    duplicates ("warn" or "refuse") first checks images, raw photos and derivatives for
+    near-duplicates; "refuse" stops the build if a painting is in two collections.
+    """
+    print("Starting build...")
+    manifest = load_manifest()
+
+    if duplicates:
+        from duplicates import check_duplicates
+        with tracer.stage("duplicates"):
+            if not check_duplicates(refuse=duplicates == "refuse"):
+                return
+
+    # --- Process site config ---
+    if site:
+        with tracer.stage("site"):
+            build_site_data(manifest, force)
 
     # --- Process gallery images ---
-    existing_data = get_existing_data()
+    with tracer.stage("load"):
+        existing_data = get_existing_data()
+        derivatives = load_derivatives()
+        intrinsics = load_intrinsics()
     gallery_data = {}
 
     if not IMAGES_DIR.exists() or not IMAGES_DIR.is_dir():
         print(f"Error: '{IMAGES_DIR}' directory not found.")
         return
 
-    # Find all collection directories
-    collection_dirs = [d for d in IMAGES_DIR.iterdir() if d.is_dir()]
-
-    for collection_dir in sorted(collection_dirs, key=collection_sort_key):
-        collection_name_str = collection_dir.name
-        collection_title = format_collection_name(collection_name_str)
-        print(f"Processing collection: {collection_title}...")
-
-        # Read collection description
-        info_file = collection_dir / '_collection.info'
-        description = ""
-        if info_file.exists():
-            with open(info_file, 'r', encoding='utf-8') as f:
-                description = f.read().strip()
-        
-        # Prepare collection data structure
-        gallery_data[collection_title] = {
-            "description": description,
-            "paintings": []
-        }
-
-        # Find all image files
-        image_files = sorted(list(collection_dir.glob('*.jpg')) + list(collection_dir.glob('*.png')))
-
-        for img_path in image_files:
-            img_filename = img_path.name
-            relative_path = f"{collection_name_str}/{img_filename}"
-
-            # Check if we have existing data for this image
-            existing_painting_data = None
-            if collection_title in existing_data and "paintings" in existing_data[collection_title]:
-                for p in existing_data[collection_title]["paintings"]:
-                    if p.get("file") == relative_path:
-                        existing_painting_data = p
-                        break
-            
-            if existing_painting_data:
-                # Preserve existing data
-                gallery_data[collection_title]["paintings"].append(existing_painting_data)
-            else:
-                # Add new image with placeholder data
-                print(f"  Adding new image: {img_filename}")
-                gallery_data[collection_title]["paintings"].append({
-                    "file": relative_path,
-                    "title": f"{img_path.stem.replace('_', ' ').replace('-', ' ').title()}",
-                    "meta": "Medium, Size",
-                    "price": "$TBD"
-                })
-
-    # Write the new data file
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(gallery_data, f, indent=4, ensure_ascii=False)
-    
-    print(f"\nBuild complete. Gallery data written to '{OUTPUT_FILE}'.")
-    print("You can now edit this file to update painting details.")
+    previous_collections = manifest.get("collections", {})
+    collections = {}
+    changed = []
+
+    with tracer.stage("collections") as span:
+        # Collections are fingerprinted and scanned in threads, then assembled in display order.
+        # cProfile only sees the thread it was enabled in, so a profiled scan runs in this one.
+        pending = []
+        with ThreadPoolExecutor(max_workers=SCAN_THREADS) as pool:
+            submit = run_inline if tracer.profile_stage == "collections" else pool.submit
+            for collection_dir in list_collections():
+                collection_name_str = collection_dir.name
+                collection_title = format_collection_name(collection_name_str)
+                previous = previous_collections.get(collection_name_str, {})
+
+                if (collections_to_check is not None and collection_name_str not in collections_to_check
+                        and previous and collection_title in existing_data):
+                    pending.append((collection_name_str, collection_title, previous, None))
+                    continue
+                pending.append((collection_name_str, collection_title, previous, submit(
+                    build_collection, collection_dir, collection_title, previous, existing_data,
+                    derivatives.get(collection_name_str, {}), intrinsics, force)))
+
+            for collection_name_str, collection_title, previous, future in pending:
+                if future is None:
+                    collections[collection_name_str] = previous
+                    gallery_data[collection_title] = existing_data[collection_title]
+                    continue
+                r = future.result()
+                for message in r["messages"]:
+                    print(message)
+                collections[collection_name_str] = r["record"]
+                gallery_data[collection_title] = r["data"]
+                if r["status"] == "scanned":
+                    changed.append(collection_title)
+                tracer.item(span, collection_name_str, r["started"], r["seconds"], r["bytes_read"],
+                            tid=r["tid"], files=len(r["record"]["files"]), status=r["status"])
+
+    manifest["collections"] = collections
+    with tracer.stage("write") as span:
+        if changed:
+            save_intrinsics(intrinsics)
+        indexes_changed = assign_flat_indexes(gallery_data)
+
+        # Write the new data file, unless nothing changed at all
+        if not changed and not indexes_changed and list(gallery_data) == list(existing_data):
+            print(f"\nNo collections changed, '{OUTPUT_FILE}' left untouched.")
+        elif write_json_if_changed(OUTPUT_FILE, gallery_data, indent=4):
+            span["bytes_written"] = OUTPUT_FILE.stat().st_size
+            print(f"\nBuild complete. Gallery data written to '{OUTPUT_FILE}' ({len(changed)} collection(s) rebuilt).")
+            print("You can now edit this file to update painting details.")
+        else:
+            print(f"\nBuild complete. '{OUTPUT_FILE}' is already up to date.")
+
+    with tracer.stage("index") as span:
+        if write_index(gallery_data):
+            span["bytes_written"] = INDEX_FILE.stat().st_size
+        if write_if_changed(SEARCH_INDEX_FILE, compact_json(build_search_index(gallery_data))):
+            span["bytes_written"] += SEARCH_INDEX_FILE.stat().st_size
+            print(f"Search index written to '{SEARCH_INDEX_FILE}'.")
+        # Last, as its cache version hashes the files written above
+        if write_service_worker():
+            span["bytes_written"] += SW_FILE.stat().st_size
+
+    save_manifest(manifest)
 
 if __name__ == '__main__':
-    run_build()
+    parser = argparse.ArgumentParser(description="Build gallery-data.json, site-data.json and index.html.")
+    parser.add_argument('--force', action='store_true', help="ignore the build manifest and rebuild every collection")
+    parser.add_argument('--duplicates', choices=("warn", "refuse"), default=None,
+                        help="check for near-duplicate images first; refuse stops the build "
+                             "if a painting is in more than one collection")
+    timing.add_arguments(parser)
+    args = parser.parse_args()
+    timing.configure(args, "build")
+    run_build(force=args.force, duplicates=args.duplicates)
+    tracer.report()
@@ -0,0 +1,267 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "Pillow", "numpy>=2.0" ]
+# ///
+
+import os
+import re
+import json
+import time
+import argparse
+import itertools
+
+import numpy as np
+from PIL import Image, ImageOps
+
+import process_images
+from process_images import run_jobs, source_hash
+
+GALLERY_DIR = 'images'
+RAW_DIR = 'images_raw'
+DERIVED_DIR = 'derived'
+# Gallery images plus the formats process_images.py derives (derived/ also holds AVIF)
+IMAGE_EXTENSIONS = process_images.IMAGE_EXTENSIONS + tuple(
+    sorted({f".{ext}" for ext, _ in process_images.DERIVATIVE_FORMATS.values()} - set(process_images.IMAGE_EXTENSIONS)))
+CACHE_FILE = os.path.join('.build-cache', 'phash-cache.json')
+CACHE_VERSION = 1
+REPORT_FILE = 'duplicates-report.json'
+
+# 64-bit difference hash: one bit per horizontally adjacent pair of a 9x8 grayscale thumbnail
+HASH_WIDTH, HASH_HEIGHT = 9, 8
+THRESHOLD = 6      # Hashes this many bits apart or fewer count as the same picture
+CHUNKS = 4         # Multi-index hashing: the hash is split into CHUNKS 16-bit keys
+CHUNK_BITS = 64 // CHUNKS
+DERIVATIVE_SUFFIX = re.compile(r'-\d+$')  # derived/<collection>/<stem>-<width>.<ext>
+
+def dhash(path):
+    """
+    Difference hash of an image as a 16-digit hex string. JPEGs are decoded at
+    reduced scale; EXIF orientation is applied so rotated copies still match.
+    """
+    with Image.open(path) as img:
+        img.draft('L', (HASH_WIDTH * 8, HASH_HEIGHT * 8))
+        small = ImageOps.exif_transpose(img).convert('L').resize((HASH_WIDTH, HASH_HEIGHT), Image.Resampling.BOX)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return np.packbits(bits).tobytes().hex()
+
+def hash_one(path):
+    """Hashes one image in a worker process; returns a result dict instead of raising."""
+    start = time.perf_counter()
+    try:
+        digest = dhash(path)
+        return {"source": path, "status": "processed", "seconds": time.perf_counter() - start,
+                "hash": digest, "bytes_read": os.path.getsize(path)}
+    except Exception as e:
+        return {"source": path, "status": "failed", "seconds": time.perf_counter() - start, "error": str(e)}
+
+def classify(path):
+    """
+    Returns (identity, group) for an image path. A gallery image and its derivatives
+    share an identity, so they never match each other; the group is the gallery
+    collection, or "raw" for the unsorted photos in images_raw.
+    """
+    parts = path.replace(os.sep, '/').split('/')
+    stem = os.path.splitext(parts[-1])[0]
+    if parts[0] == DERIVED_DIR:
+        return f"{GALLERY_DIR}/{parts[1]}/{DERIVATIVE_SUFFIX.sub('', stem)}", parts[1]
+    if parts[0] == GALLERY_DIR:
+        return f"{GALLERY_DIR}/{parts[1]}/{stem}", parts[1]
+    return path, "raw"
+
+def collect_images(directories):
+    """Every image under the given directories, skipping the derived atlas sheets (composites)."""
+    paths = []
+    for directory in directories:
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != process_images.ATLAS_DIR)
+            paths.extend(os.path.join(root, name).replace(os.sep, '/') for name in sorted(files)
+                         if name.lower().endswith(IMAGE_EXTENSIONS))
+    return paths
+
+def load_cache():
+    """Loads the perceptual hash cache ({sha256: dhash}), or an empty one if missing or outdated."""
+    if os.path.exists(CACHE_FILE):
+        try:
+            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get("version") == CACHE_VERSION:
+                return cache
+        except (OSError, ValueError):
+            pass
+    return {"version": CACHE_VERSION, "hashes": {}}
+
+def save_cache(cache):
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+
+def flip_masks(bits, max_flips):
+    """Every mask of up to max_flips set bits within a chunk, starting with 0."""
+    masks = [0]
+    for flips in range(1, max_flips + 1):
+        masks.extend(sum(1 << b for b in combo) for combo in itertools.combinations(range(bits), flips))
+    return np.array(masks, dtype=np.uint64)
+
+def near_pairs(hashes, threshold=THRESHOLD):
+    """
+    All index pairs (i < j) of a uint64 hash array that differ in at most threshold bits.
+    Multi-index hashing avoids comparing all pairs: by pigeonhole, such a pair agrees on
+    at least one of the CHUNKS chunks up to threshold // CHUNKS flipped bits. Hashes are
+    bucketed by each chunk, every hash looks up its own bucket and the buckets of its
+    flip variants, and the candidates are verified with a vectorized popcount.
+    Returns (i, j, distance) arrays.
+    """
+    n = len(hashes)
+    flips = flip_masks(CHUNK_BITS, threshold // CHUNKS)
+    indexes = np.arange(n)
+    found = [(indexes[:0], indexes[:0], indexes[:0])]
+    for c in range(CHUNKS):
+        keys = ((hashes >> np.uint64(c * CHUNK_BITS)) & np.uint64((1 << CHUNK_BITS) - 1)).astype(np.intp)
+        # Bucket table: hashes sorted by key, with each key's start and count
+        order = np.argsort(keys, kind='stable')
+        bucket_counts = np.bincount(keys, minlength=1 << CHUNK_BITS)
+        bucket_starts = np.cumsum(bucket_counts) - bucket_counts
+        for mask in flips:
+            query = keys ^ int(mask)
+            counts = bucket_counts[query]
+            total = int(counts.sum())
+            # Expand each hash's bucket into explicit (i, j) candidates
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            i = np.repeat(indexes, counts)
+            j = order[np.repeat(bucket_starts[query], counts) + offsets]
+            distance = np.bitwise_count(hashes[i] ^ hashes[j]).astype(np.intp)
+            keep = (i < j) & (distance <= threshold)
+            found.append((i[keep], j[keep], distance[keep]))
+    # A pair agreeing on several chunks is found several times
+    i, j, distance = (np.concatenate(parts) for parts in zip(*found))
+    pairs, first = np.unique(i * n + j, return_index=True)
+    return pairs // n, pairs % n, distance[first]
+
+def cluster(n, i, j):
+    """Union-find over the matched pairs; returns the groups of more than one index."""
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(i.tolist(), j.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    groups = {}
+    for x in range(n):
+        groups.setdefault(find(x), []).append(x)
+    return [members for members in groups.values() if len(members) > 1]
+
+def find_duplicates(directories=(GALLERY_DIR, RAW_DIR, DERIVED_DIR), threshold=THRESHOLD, workers=None):
+    """
+    Hashes every image (hashes are cached by file content), then groups near-duplicates.
+    Returns a list of findings, each {"kind", "group"s, "files", "distance"} where kind is
+    "cross-collection" (the same picture in several gallery collections), "same-collection"
+    or "raw" (one painting photographed more than once). A raw photo matching the gallery
+    image it became is expected and not reported.
+    """
+    paths = collect_images([d for d in directories if os.path.isdir(d)])
+    hash_cache = load_cache()
+    source_cache = process_images.load_cache()
+    digests = {p: source_hash(source_cache, p) for p in paths}
+    pending = sorted({p for p in paths if digests[p] not in hash_cache["hashes"]})
+    if pending:
+        print(f"Hashing {len(pending)} of {len(paths)} image(s)...")
+    for r in run_jobs(hash_one, [(p,) for p in pending], workers or os.cpu_count() or 1):
+        if r["status"] == "processed":
+            hash_cache["hashes"][digests[r["source"]]] = r["hash"]
+        else:
+            print(f"  Warning: could not hash {r['source']}: {r['error']}")
+    save_cache(hash_cache)
+    process_images.save_cache(source_cache)
+
+    paths = [p for p in paths if digests[p] in hash_cache["hashes"]]
+    hashes = np.array([int(hash_cache["hashes"][digests[p]], 16) for p in paths], dtype=np.uint64)
+    identities = [classify(p) for p in paths]
+    codes = {}
+    identity_ids = np.array([codes.setdefault(identity, len(codes)) for identity, _ in identities], dtype=np.int64)
+    i, j, distance = near_pairs(hashes, threshold)
+    # Pairs within one identity (an image and its own derivatives) are not duplicates
+    other = identity_ids[i] != identity_ids[j]
+    i, j, distance = i[other], j[other], distance[other]
+
+    clusters = cluster(len(paths), i, j)
+    cluster_of = {m: c for c, members in enumerate(clusters) for m in members}
+    max_distance = [0] * len(clusters)
+    for a, d in zip(i.tolist(), distance.tolist()):
+        max_distance[cluster_of[a]] = max(max_distance[cluster_of[a]], d)
+
+    findings = []
+    for c, members in enumerate(clusters):
+        # One file per identity: the gallery image itself rather than one of its derivatives
+        representatives = {}
+        for m in sorted(members, key=lambda m: (not paths[m].startswith(GALLERY_DIR + '/'), paths[m])):
+            representatives.setdefault(identities[m][0], m)
+        gallery = [m for m in representatives.values() if identities[m][1] != "raw"]
+        raw = len(representatives) - len(gallery)
+        if len({identities[m][1] for m in gallery}) > 1:
+            kind = "cross-collection"
+        elif len(gallery) > 1:
+            kind = "same-collection"
+        elif raw > 1:
+            kind = "raw"
+        else:
+            continue
+        findings.append({"kind": kind, "groups": sorted({identities[m][1] for m in representatives.values()}),
+                         "files": sorted(paths[m] for m in representatives.values()),
+                         "distance": max_distance[c]})
+    findings.sort(key=lambda f: (f["kind"] != "cross-collection", f["files"]))
+    return findings
+
+def print_findings(findings):
+    if not findings:
+        print("No duplicate images found.")
+        return
+    labels = {"cross-collection": "ERROR", "same-collection": "WARNING", "raw": "NOTE"}
+    for finding in findings:
+        print(f"  [{labels[finding['kind']]}] {finding['kind']} duplicate "
+              f"(up to {finding['distance']} bits apart):")
+        for file in finding["files"]:
+            print(f"      {file}")
+    counts = {kind: sum(f["kind"] == kind for f in findings) for kind in labels}
+    print(f"{counts['cross-collection']} cross-collection, {counts['same-collection']} same-collection "
+          f"and {counts['raw']} raw duplicate group(s).")
+
+def check_duplicates(refuse=False, threshold=THRESHOLD, workers=None):
+    """
+    Build-time check: prints the findings and returns False if refuse is set and
+    a picture appears in more than one gallery collection.
+    """
+    print("Checking for duplicate images...")
+    findings = find_duplicates(threshold=threshold, workers=workers)
+    print_findings(findings)
+    if refuse and any(f["kind"] == "cross-collection" for f in findings):
+        print("Error: the same painting is in more than one collection (see above).")
+        return False
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Find duplicate and near-duplicate images by perceptual hash.")
+    parser.add_argument('directories', nargs='*', default=[GALLERY_DIR, RAW_DIR, DERIVED_DIR],
+                        help="directories to scan (default: %(default)s)")
+    parser.add_argument('--threshold', type=int, default=THRESHOLD,
+                        help="maximum differing bits of 64 for a match (default: %(default)s)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--report', default=None, metavar='FILE', help=f"also write the findings as JSON, e.g. {REPORT_FILE}")
+    parser.add_argument('--strict', action='store_true', help="exit with status 1 on cross-collection duplicates")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    findings = find_duplicates(args.directories, args.threshold, args.workers)
+    print_findings(findings)
+    print(f"Done in {time.perf_counter() - start:.2f}s.")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(findings, f, indent=1)
+    if args.strict and any(f["kind"] == "cross-collection" for f in findings):
+        raise SystemExit(1)
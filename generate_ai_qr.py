@@ -1,16 +1,15 @@
 # /// script
 # requires-python = ">=3.11"
-# dependencies = [ "requests", "pillow" ]
+# dependencies = [ "httpx", "gradio_client", "qrcode[pil]", "numpy" ]
 # ///
 
-import requests
 import time
-import os
+import asyncio
+import argparse
 from pathlib import Path
 
-# Hugging Face Inference API (FREE!)
-API_URL = "https://api-inference.huggingface.co/models/monster-labs/control_v1p_sd15_qrcode_monster"
-HF_TOKEN = os.getenv("HF_TOKEN", "")  # Optional: set HF_TOKEN env var for higher rate limits
+from ai_client import Journal, ResponseCache, make_job, run_jobs, print_summary, print_cache_stats
+from ai_backends import BACKENDS, HttpBackend, API_URL, HF_TOKEN
 
 url = "https://ninjalevel.github.io/art-sale-2025/"
 
@@ -38,79 +37,81 @@ prompts = [
     "renaissance painting style, classical art, museum masterpiece quality",
 ]
 
-# Create output directory
 output_dir = Path("ai-qr-codes")
-output_dir.mkdir(exist_ok=True)
 
-print("Generating AI Artistic QR Codes using Hugging Face (FREE API)...")
-print("=" * 70)
-print(f"Using model: monster-labs/control_v1p_sd15_qrcode_monster")
-print("=" * 70)
+def plan_jobs(backend, numbers=None):
+    """
+    One job per prompt (or per selected prompt number), each with its own seed for
+    variety. A job's id covers the backend, its model and the full request.
+    """
+    jobs = []
+    for i, prompt in enumerate(prompts, 1):
+        if numbers and i not in numbers:
+            continue
+        output_path = output_dir / f"ai-qr-{i:02d}-{prompt.split(',')[0].replace(' ', '-')[:25]}.png"
+        jobs.append(make_job(output_path, backend.request(prompt, url, seed=i * 1000),
+                             f"{backend.name}:{backend.model}"))
+    return jobs
 
-headers = {}
-if HF_TOKEN:
-    headers = {"Authorization": f"Bearer {HF_TOKEN}"}
-    print("\nUsing HF token for higher rate limits...")
-else:
-    print("\nNo HF_TOKEN set - using free tier with rate limits")
-    print("To get higher limits: export HF_TOKEN='your_token_here'")
-    print("Get token at: https://huggingface.co/settings/tokens")
-
-print("\n")
-
-generated = 0
-for i, prompt in enumerate(prompts, 1):
+async def generate(backend, jobs, concurrency, rate, restart, cache):
+    journal = Journal(output_dir / f"journal-{backend.name}.jsonl", restart)
     try:
-        print(f"{i}. Generating: {prompt[:60]}...")
+        async with backend.connect(concurrency) as call:
+            return await run_jobs(jobs, call, journal, concurrency=concurrency, rate=rate, cache=cache)
+    finally:
+        journal.close()
 
-        payload = {
-            "inputs": f"{prompt}, QR code, scannable",
-            "parameters": {
-                "qr_code_content": url,
-                "num_inference_steps": 30,
-                "guidance_scale": 7.5,
-                "controlnet_conditioning_scale": 1.5
-            }
-        }
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate AI artistic QR codes.")
+    parser.add_argument('--backend', choices=BACKENDS, default="hf",
+                        help="hf: Hugging Face Inference API, gradio: the QR art Space, "
+                             "stub: local deterministic images (default: %(default)s)")
+    parser.add_argument('--api-url', default=API_URL,
+                        help="endpoint for the hf backend, e.g. a local stub_inference_server.py")
+    parser.add_argument('--only', type=int, nargs='+', metavar='N', help="generate only these prompt numbers")
+    parser.add_argument('--concurrency', type=int, default=None, help="requests in flight at once (default: per backend)")
+    parser.add_argument('--rate', type=float, default=None, help="requests started per second (default: per backend)")
+    parser.add_argument('--restart', action='store_true', help="start a fresh journal")
+    parser.add_argument('--no-cache', action='store_true', help="request every image even if it is cached")
+    parser.add_argument('--cache-stats', action='store_true', help="print the response cache's statistics and exit")
+    args = parser.parse_args(argv)
 
-        response = requests.post(API_URL, headers=headers, json=payload)
+    if args.cache_stats:
+        print_cache_stats(ResponseCache().stats())
+        return
 
-        if response.status_code == 200:
-            image_path = output_dir / f"qr-{i:02d}-{prompt.split(',')[0].replace(' ', '-')[:30]}.png"
-            with open(image_path, "wb") as f:
-                f.write(response.content)
-            print(f"   [OK] Saved: {image_path.name}")
-            generated += 1
-        elif response.status_code == 503:
-            print(f"   [WAIT] Model loading, waiting 20s...")
-            time.sleep(20)
-            # Retry once
-            response = requests.post(API_URL, headers=headers, json=payload)
-            if response.status_code == 200:
-                image_path = output_dir / f"qr-{i:02d}-{prompt.split(',')[0].replace(' ', '-')[:30]}.png"
-                with open(image_path, "wb") as f:
-                    f.write(response.content)
-                print(f"   [OK] Saved: {image_path.name}")
-                generated += 1
-            else:
-                print(f"   [FAIL] Failed: {response.status_code}")
-        elif response.status_code == 429:
-            print(f"   [RATE] Rate limited! Waiting 60s...")
-            time.sleep(60)
+    cache = None if args.no_cache else ResponseCache()
+    backend = HttpBackend(args.api_url) if args.backend == "hf" else BACKENDS[args.backend]()
+    concurrency = args.concurrency or backend.concurrency
+    rate = args.rate or backend.rate
+    output_dir.mkdir(exist_ok=True)
+
+    print("Generating AI Artistic QR Codes...")
+    print("=" * 70)
+    print(f"Backend: {backend.name} ({backend.model})")
+    print("=" * 70)
+    if backend.name == "hf":
+        if HF_TOKEN:
+            print("\nUsing HF token for higher rate limits...")
         else:
-            print(f"   [ERROR] Error: {response.status_code} - {response.text[:100]}")
+            print("\nNo HF_TOKEN set - using free tier with rate limits")
+            print("To get higher limits: export HF_TOKEN='your_token_here'")
+            print("Get token at: https://huggingface.co/settings/tokens")
+
+    jobs = plan_jobs(backend, set(args.only or ()))
+    print(f"\n{len(jobs)} prompt(s), up to {concurrency} at once, {rate} request(s)/s\n")
 
-        # Be nice to the free API
-        time.sleep(2)
+    start = time.perf_counter()
+    results = asyncio.run(generate(backend, jobs, concurrency, rate, args.restart, cache))
+    counts = print_summary(results, time.perf_counter() - start, cache)
 
-    except Exception as e:
-        print(f"   [ERROR] Exception: {e}")
-        continue
+    print("\n" + "=" * 70)
+    print(f"Generated {counts['generated']} AI artistic QR codes ({counts['cached']} from cache)!")
+    print(f"Location: {output_dir}/")
+    print(f"All QR codes link to: {url}")
+    print("=" * 70)
+    print("\nIMPORTANT: Test these QR codes with your phone before using!")
+    print("AI-generated codes may have reduced scannability. Run verify_qr.py to check them.")
 
-print("\n" + "=" * 70)
-print(f"Generated {generated} AI artistic QR codes!")
-print(f"Location: {output_dir}/")
-print(f"All QR codes link to: {url}")
-print("=" * 70)
-print("\nNote: Test these QR codes before using - AI generation may affect")
-print("scannability. Pick the ones that scan reliably!")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "qrcode[pil]", "numpy" ]
+# ///
+
+import os
+import json
+import html
+import time
+import argparse
+from urllib.parse import quote
+
+import qrcode
+
+import timing
+from timing import tracer
+from qr_engine import URL, DRAWERS, MASKS, PALETTES, make_variant, render_variants
+
+GALLERY_FILE = "gallery-data.json"
+OUTPUT_DIR = "qr-labels"
+CODES_DIR = os.path.join(OUTPUT_DIR, "codes")
+SHEET_FILE = os.path.join(OUTPUT_DIR, "labels.html")
+DEEP_LINK_PREFIX = "#p="  # Read by js/app.js to open the painting in the lightbox
+# Labels carry no embedded image, so medium error correction keeps the codes small
+LABEL_ERROR_CORRECTION = qrcode.constants.ERROR_CORRECT_M
+LABEL_FORMATS = ("svg", "png")
+
+# Label sheet geometry: 3 x 7 labels of 63.5 x 38.1 mm on A4 (Avery L7160 layout)
+SHEET_CSS = """
+@page { size: A4; margin: 15.1mm 7.2mm; }
+* { box-sizing: border-box; }
+body { margin: 0; font-family: Georgia, serif; color: #222; }
+.sheet { display: grid; grid-template-columns: repeat(3, 63.5mm); grid-auto-rows: 38.1mm;
+         column-gap: 2.5mm; break-after: page; }
+.label { display: flex; align-items: center; gap: 3mm; padding: 2.5mm; overflow: hidden; }
+.label img { width: 33mm; height: 33mm; flex: none; }
+.label h2 { font-size: 10pt; margin: 0 0 1mm; }
+.label p { font-size: 8pt; margin: 0 0 1mm; }
+.label .price { font-size: 11pt; font-weight: bold; }
+@media screen { body { background: #eee; } .sheet { background: #fff; width: 210mm; margin: 5mm auto;
+                padding: 15.1mm 7.2mm; } .label { outline: 1px dashed #ccc; } }
+"""
+LABELS_PER_SHEET = 21
+
+def deep_link(painting, base_url=URL):
+    """The URL that opens one painting directly in the lightbox."""
+    return f"{base_url}{DEEP_LINK_PREFIX}{quote(painting['file'], safe='/')}"
+
+def load_paintings(gallery_file=GALLERY_FILE):
+    """Returns every painting in gallery order."""
+    with open(gallery_file, 'r', encoding='utf-8') as f:
+        gallery = json.load(f)
+    return [p for collection in gallery.values() for p in collection["paintings"]]
+
+def plan_labels(paintings, base_url, fmt, drawer, mask, palette):
+    """
+    One variant per painting with its deep link as the payload. The variant's cache key
+    covers (payload, style), so only codes whose URL or style changed are re-rendered.
+    """
+    variants = []
+    for painting in paintings:
+        file = f"{os.path.splitext(painting['file'])[0].replace('/', '-')}.{fmt}"
+        variants.append(make_variant(file, drawer, mask, palette["c1"], palette["c2"],
+                                     url=deep_link(painting, base_url)))
+    return variants
+
+def render_sheet(paintings, variants):
+    """Lays the labels out as a printable HTML page, one .sheet per printed page."""
+    labels = []
+    for painting, variant in zip(paintings, variants):
+        meta = f"<p>{html.escape(painting['meta'])}</p>" if painting.get("meta") else ""
+        labels.append(f'<div class="label"><img src="codes/{quote(variant["file"])}" alt="">'
+                      f'<div><h2>{html.escape(painting["title"])}</h2>{meta}'
+                      f'<p class="price">{html.escape(painting.get("price", ""))}</p></div></div>')
+    sheets = [''.join(labels[i:i + LABELS_PER_SHEET]) for i in range(0, len(labels), LABELS_PER_SHEET)]
+    body = '\n'.join(f'<div class="sheet">{sheet}</div>' for sheet in sheets)
+    return (f'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n'
+            f'<title>Painting labels</title>\n<style>{SHEET_CSS}</style>\n</head>\n<body>\n{body}\n</body>\n</html>\n')
+
+def write_sheet(content, sheet_file=SHEET_FILE):
+    """Writes the label sheet only if its content changed; returns True if written."""
+    if os.path.exists(sheet_file):
+        with open(sheet_file, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    with open(sheet_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+if __name__ == '__main__':
+    palettes = {p["name"]: p for p in PALETTES}
+    parser = argparse.ArgumentParser(description="Generate a deep-link QR label for every painting in the gallery.")
+    parser.add_argument('--base-url', default=URL, help="site URL the labels link to (default: %(default)s)")
+    parser.add_argument('--format', choices=LABEL_FORMATS, default="svg",
+                        help="svg prints sharp at any size, png for other tools (default: %(default)s)")
+    parser.add_argument('--drawer', choices=DRAWERS, default="Rounded", help="module style (default: %(default)s)")
+    parser.add_argument('--mask', choices=MASKS, default="Solid", help="color mask (default: %(default)s)")
+    parser.add_argument('--palette', choices=palettes, default="Charcoal", help="color palette (default: %(default)s)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="re-render codes that are already up to date")
+    timing.add_arguments(parser)
+    args = parser.parse_args()
+    timing.configure(args, "qr-labels")
+
+    start = time.perf_counter()
+    paintings = load_paintings()
+    variants = plan_labels(paintings, args.base_url, args.format, args.drawer, args.mask, palettes[args.palette])
+    print(f"Generating deep-link QR labels for {len(paintings)} painting(s)...")
+    render_variants(variants, CODES_DIR, url=args.base_url, workers=args.workers, force=args.force,
+                    error_correction=LABEL_ERROR_CORRECTION)
+    with tracer.stage("sheet") as span:
+        written = write_sheet(render_sheet(paintings, variants))
+        span["bytes_written"] = os.path.getsize(SHEET_FILE) if written else 0
+
+    print(f"Label sheet {'written' if written else 'unchanged'}: {SHEET_FILE} "
+          f"({-(-len(paintings) // LABELS_PER_SHEET)} page(s)).")
+    print(f"Done in {time.perf_counter() - start:.2f}s. Labels link to {args.base_url}{DEEP_LINK_PREFIX}<painting>")
+    tracer.report()
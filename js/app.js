@@ -1,12 +1,16 @@
 document.addEventListener('DOMContentLoaded', () => {
-    
-    let allPaintings = [];
-    let paintingsByCollection = {};
-    
+    // The page, gallery included, is pre-rendered by build.py; this script adds the lightbox
+    // and pages in the tiles of large collections. Without it every tile is a plain link
+    // to its full-size image.
+
     // --- DOM Elements ---
     const gallery = document.getElementById('gallery');
+    const items = []; // Tiles by flat painting index; paged-out ones are missing until loaded
+    const totalItems = parseInt(gallery.dataset.total);
+    const placeholders = Array.from(gallery.querySelectorAll('.gallery-more'));
     const lightbox = document.getElementById('lightbox');
     const lightboxImg = lightbox.querySelector('.lightbox-img');
+    const lightboxSources = lightbox.querySelectorAll('.lightbox-picture source');
     const lightboxTitle = lightbox.querySelector('.lightbox-title');
     const closeBtn = lightbox.querySelector('.lightbox-close');
     const prevBtn = lightbox.querySelector('.lightbox-prev');
@@ -14,109 +18,363 @@ document.addEventListener('DOMContentLoaded', () => {
 
     let currentIndex = 0;
 
-    // --- Fetch and Render ---
-    async function loadSiteData() {
-        try {
-            const response = await fetch('site-data.json');
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            const siteData = await response.json();
-            document.getElementById('artist_name').textContent = siteData.artist_name;
-            const contactEmail = document.getElementById('contact_email');
-            contactEmail.textContent = siteData.contact_email;
-            contactEmail.parentElement.href = `mailto:${siteData.contact_email}`;
-            document.getElementById('intro_title').textContent = siteData.intro_title;
-            document.getElementById('intro_subtitle').textContent = siteData.intro_subtitle;
-
-            // Event details
-            document.getElementById('location').textContent = siteData.location;
-            document.getElementById('date').textContent = siteData.date;
-            document.getElementById('time').textContent = siteData.time;
-
-            // Convert email in note to mailto link
-            const noteElement = document.getElementById('note');
-            const emailRegex = /([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+\.[a-zA-Z0-9_-]+)/gi;
-            const noteWithLink = siteData.note.replace(emailRegex, '<a href="mailto:$1">$1</a>');
-            noteElement.innerHTML = noteWithLink;
-
-            document.title = `${siteData.artist_name} - ${siteData.intro_subtitle}`
-        } catch (error) {
-            console.error("Could not load site data:", error);
+    const LIGHTBOX_SIZES = '90vw';
+
+    // Deep links from the printed painting labels: #p=<painting file>
+    const DEEP_LINK_PREFIX = '#p=';
+
+    // Lightbox neighbours fetched and decoded ahead, per direction
+    const PREFETCH_NEIGHBOURS = 3;
+    // Prefetching may spend this many seconds of the connection's downlink per lightbox step
+    const PREFETCH_SECONDS = 4;
+    // Assumed size of a lightbox image until one has been measured
+    const PREFETCH_DEFAULT_BYTES = 300e3;
+
+    // Paged-out tiles are loaded once their placeholder is this close to the viewport
+    const PAGE_MARGIN = '1500px 0px';
+
+    let prefetched = new Map(); // Painting index -> decoded detached <img>
+    const pages = new Map(); // Placeholder -> promise of its page being loaded into it
+    let measuredBytes = 0;
+    let measuredImages = 0;
+
+    // --- Search and Filter DOM ---
+    const filterForm = document.querySelector('.gallery-filter');
+    const filterQuery = filterForm.querySelector('.filter-query');
+    const filterPrice = filterForm.querySelector('.filter-price');
+    const filterAvailable = filterForm.querySelector('.filter-available input');
+    const filterCount = filterForm.querySelector('.filter-count');
+    const collectionTitles = gallery.querySelectorAll('.collection-title');
+    const collectionGrids = gallery.querySelectorAll('.gallery-collection');
+
+    // Must match build.py's tokenize()
+    const SEARCH_STOPWORDS = new Set('a an and are as at be by for from in is it of on or the this to with'.split(' '));
+    // "under $500", "below 500", "<= 500" in the search box act as a price filter
+    const PRICE_QUERY = /(?:under|below|<=?)\s*\$?\s*(\d[\d,]*)/i;
+
+    let searchIndex = null; // Promise of search-index.json, fetched on first use
+    let matches = null; // Sorted flat indexes shown while filtering, null when showing everything
+    let matchedCollections = [];
+    let searchGeneration = 0;
+
+    async function fetchJson(url) {
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
         }
+        return response.json();
     }
 
-    async function loadGalleryData() {
-        try {
-            await loadSiteData(); // Load site data first
-            const response = await fetch('gallery-data.json');
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            paintingsByCollection = await response.json();
-            allPaintings = Object.values(paintingsByCollection).flatMap(collection => collection.paintings);
-            populateGallery();
-            setupEventListeners();
-        } catch (error) {
-            console.error("Could not load gallery data:", error);
-            gallery.innerHTML = '<p class="error">Could not load gallery. Please try again later.</p>';
+    // First position in a sorted array whose value is not below `value`
+    function lowerBound(array, value) {
+        let lo = 0;
+        let hi = array.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (array[mid] < value) lo = mid + 1; else hi = mid;
         }
+        return lo;
     }
 
+    // First position in a sorted array whose value is above `value`
+    function upperBound(array, value) {
+        let lo = 0;
+        let hi = array.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (array[mid] <= value) lo = mid + 1; else hi = mid;
+        }
+        return lo;
+    }
 
+    // --- Paged Tiles ---
+    // build.py renders the first tiles of the gallery and writes the rest, a few blocks at a
+    // time, to the gallery pages named by .gallery-more placeholders, which they replace.
+    function addItems(elements) {
+        elements.forEach(item => {
+            const index = parseInt(item.dataset.index);
+            items[index] = item;
+            if (matches) item.classList.toggle('match', matches[lowerBound(matches, index)] === index);
+        });
+    }
 
+    function loadPage(placeholder) {
+        if (!pages.has(placeholder)) {
+            pages.set(placeholder, fetchJson(placeholder.dataset.page).then(page => {
+                const template = document.createElement('template');
+                template.innerHTML = page.grids.join('');
+                addItems(template.content.querySelectorAll('.gallery-item'));
+                placeholder.replaceWith(template.content);
+                pageObserver.unobserve(placeholder);
+            }).catch(error => {
+                pages.delete(placeholder);
+                throw error;
+            }));
+        }
+        return pages.get(placeholder);
+    }
 
-    // --- Populate Gallery ---
-    function populateGallery() {
-        gallery.innerHTML = ''; // Clear existing content
-        Object.keys(paintingsByCollection).forEach(collectionName => {
-            const collection = paintingsByCollection[collectionName];
-            
-            // Create a title for the collection
-            const collectionTitle = document.createElement('h2');
-            collectionTitle.className = 'collection-title';
-            collectionTitle.textContent = collectionName;
-            gallery.appendChild(collectionTitle);
+    // Resolves to the tile of a painting, loading its page first if it is paged out
+    function loadItem(index) {
+        if (items[index]) return Promise.resolve(items[index]);
+        const placeholder = placeholders.find(p =>
+            index >= parseInt(p.dataset.offset) && index < parseInt(p.dataset.offset) + parseInt(p.dataset.count));
+        if (!placeholder) return Promise.reject(new Error(`No painting ${index}`));
+        return loadPage(placeholder).then(() => items[index]);
+    }
 
-            // Create a description for the collection
-            if(collection.description) {
-                const collectionDescription = document.createElement('p');
-                collectionDescription.className = 'collection-description';
-                collectionDescription.textContent = collection.description;
-                gallery.appendChild(collectionDescription);
+    const pageObserver = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                loadPage(entry.target).catch(error => console.error("Could not load gallery page:", error));
             }
+        });
+    }, { rootMargin: PAGE_MARGIN });
 
-            // Create a grid for the collection
-            const collectionGrid = document.createElement('div');
-            collectionGrid.className = 'gallery-grid';
-            
-            collection.paintings.forEach((p) => {
-                const flatIndex = allPaintings.findIndex(painting => painting.file === p.file);
-                const item = document.createElement('div');
-                item.className = 'gallery-item';
-                item.dataset.index = flatIndex;
-
-                const img = document.createElement('img');
-                img.src = `images/${p.file}`;
-                img.alt = p.title;
-
-                item.appendChild(img);
-                collectionGrid.appendChild(item);
-            });
-            gallery.appendChild(collectionGrid);
+    // --- Responsive Images ---
+    // Picture tiles carry their srcsets on <source>/<img>; atlas tiles as data-avif/-webp/-jpeg
+    function srcsetFor(item, format) {
+        if (item.dataset[format]) return item.dataset[format];
+        const element = format === 'jpeg'
+            ? item.querySelector('img')
+            : item.querySelector(`source[type="image/${format}"]`);
+        return (element && element.getAttribute('srcset')) || '';
+    }
+
+    function titleOf(item) {
+        const img = item.querySelector('img');
+        return img ? img.alt : item.querySelector('.gallery-sprite').getAttribute('aria-label');
+    }
+
+    // Points a lightbox-style <picture> (AVIF/WebP sources and a JPEG <img>) at a painting
+    function fillPicture(sources, img, item) {
+        sources.forEach(source => {
+            source.srcset = srcsetFor(item, source.dataset.format);
+            source.sizes = LIGHTBOX_SIZES;
         });
+        img.srcset = srcsetFor(item, 'jpeg');
+        img.sizes = LIGHTBOX_SIZES;
+        img.src = item.getAttribute('href');
     }
 
     // --- Lightbox Logic ---
     function showLightbox(index) {
+        if (!items[index]) {
+            loadItem(index).then(() => showLightbox(index))
+                .catch(error => console.error("Could not load painting:", error));
+            return;
+        }
+        // The painting being left is in the browser's memory cache, so keeping it decoded is free
+        const previous = lightbox.classList.contains('show') ? currentIndex : null;
         currentIndex = index;
-        const painting = allPaintings[currentIndex];
+        const item = items[currentIndex];
 
-        lightboxImg.src = `images/${painting.file}`;
-        lightboxTitle.textContent = painting.title;
+        fillPicture(lightboxSources, lightboxImg, item);
+        lightboxTitle.textContent = titleOf(item);
 
         lightbox.classList.add('show');
         document.body.style.overflow = 'hidden'; // Prevent scrolling
+
+        // Neighbours wait for the painting on screen, so they never slow it down
+        lightboxImg.decode().catch(() => {}).then(() => {
+            if (currentIndex === index && lightbox.classList.contains('show')) prefetchNeighbours(index, previous);
+        });
+    }
+
+    // --- Lightbox Prefetch ---
+    // Bytes prefetching may spend per step: none with Save-Data, else a few seconds of the
+    // reported downlink. Browsers without the Network Information API get every neighbour.
+    function prefetchBudget() {
+        const connection = navigator.connection;
+        if (connection && connection.saveData) return 0;
+        if (!connection || !connection.downlink) return Infinity;
+        return connection.downlink * 1e6 / 8 * PREFETCH_SECONDS;
+    }
+
+    function averageImageBytes() {
+        return measuredImages ? measuredBytes / measuredImages : PREFETCH_DEFAULT_BYTES;
+    }
+
+    // Loads and decodes a painting in a detached copy of the lightbox <picture>, so the
+    // browser picks the same file the lightbox will and has it ready to paint
+    function preload(item) {
+        const picture = document.createElement('picture');
+        const sources = Array.from(lightboxSources, source => {
+            const copy = document.createElement('source');
+            copy.type = source.type;
+            copy.dataset.format = source.dataset.format;
+            return picture.appendChild(copy);
+        });
+        const img = picture.appendChild(document.createElement('img'));
+        fillPicture(sources, img, item);
+        img.decode().then(() => {
+            const entry = performance.getEntriesByName(img.currentSrc)[0];
+            if (entry && entry.encodedBodySize) {
+                measuredBytes += entry.encodedBodySize;
+                measuredImages++;
+            }
+        }).catch(() => {});
+        return img;
+    }
+
+    // Keeps the nearest neighbours in browsing order decoded, nearest and forward first,
+    // until the budget is spent; ones already prefetched or just shown cost nothing.
+    function prefetchNeighbours(index, previous) {
+        const wanted = new Map();
+        let budget = prefetchBudget();
+        let forward = index;
+        let backward = index;
+        for (let distance = 0; distance < PREFETCH_NEIGHBOURS; distance++) {
+            forward = neighbourOf(forward, 1);
+            backward = neighbourOf(backward, -1);
+            for (const i of [forward, backward]) {
+                if (i === index || wanted.has(i)) continue;
+                if (!items[i]) {
+                    // Paged out: load its page now, so it can be prefetched next step
+                    loadItem(i).catch(() => {});
+                    continue;
+                }
+                if (!prefetched.has(i) && i !== previous) {
+                    if (budget < averageImageBytes()) break;
+                    budget -= averageImageBytes();
+                }
+                wanted.set(i, prefetched.get(i) || preload(items[i]));
+            }
+        }
+        // Dropping the rest lets the browser free their decoded pixels
+        prefetched = wanted;
+    }
+
+    // Opens the painting named in the URL hash, loading its collection's page if need be
+    function openDeepLink() {
+        if (!location.hash.startsWith(DEEP_LINK_PREFIX)) return;
+        const file = decodeURIComponent(location.hash.slice(DEEP_LINK_PREFIX.length));
+        const href = `images/${file}`;
+        const find = () => items.findIndex(item => item && item.getAttribute('href') === href);
+        const index = find();
+        if (index !== -1) {
+            showLightbox(index);
+            return;
+        }
+        const folder = file.split('/')[0];
+        const unloaded = placeholders.filter(p => p.dataset.collection === folder && p.isConnected);
+        if (!unloaded.length) return;
+        Promise.all(unloaded.map(loadPage)).then(() => {
+            if (find() !== -1) showLightbox(find());
+        }).catch(error => console.error("Could not load gallery page:", error));
+    }
+
+    // --- Search and Filter ---
+    // build.py maps every term, price and availability to flat painting indexes, so a
+    // query is answered from those lists alone. Only tiles whose match state changes are
+    // touched; the .filtering class on the gallery hides everything not marked .match.
+    function loadSearchIndex() {
+        if (!searchIndex) {
+            searchIndex = fetchJson('search-index.json').catch(error => {
+                searchIndex = null;
+                throw error;
+            });
+        }
+        return searchIndex;
+    }
+
+    function tokenize(text) {
+        return text.toLowerCase().normalize('NFKD').replace(/[\u0300-\u036f]/g, '')
+            .split(/[^a-z0-9]+/)
+            .filter(term => term.length > 1 && !SEARCH_STOPWORDS.has(term));
+    }
+
+    // Paintings matching any indexed term that starts with the prefix, by their own
+    // title and meta or through their collection's title and description.
+    // Returns null if no indexed term starts with it at all.
+    function termMatches(index, prefix) {
+        const first = lowerBound(index.terms, prefix);
+        if (first === index.terms.length || !index.terms[first].startsWith(prefix)) return null;
+        const found = new Set();
+        for (let t = first; t < index.terms.length && index.terms[t].startsWith(prefix); t++) {
+            index.postings[t].forEach(i => found.add(i));
+            index.collection_postings[t].forEach(c => {
+                const [offset, count] = index.collections[c];
+                for (let i = offset; i < offset + count; i++) found.add(i);
+            });
+        }
+        return found;
+    }
+
+    function findMatches(index, text, maxPrice, availableOnly) {
+        const priceQuery = text.match(PRICE_QUERY);
+        if (priceQuery) {
+            const amount = parseFloat(priceQuery[1].replace(/,/g, ''));
+            maxPrice = maxPrice === null ? amount : Math.min(maxPrice, amount);
+            text = text.replace(PRICE_QUERY, ' ');
+        }
+        const terms = tokenize(text);
+        // Words no painting uses at all ("series", "painting") are ignored rather than matching nothing
+        const sets = terms.map(term => termMatches(index, term)).filter(set => set !== null);
+        if (maxPrice !== null) {
+            sets.push(new Set(index.by_price.slice(0, upperBound(index.prices, maxPrice))));
+        }
+        if (availableOnly) {
+            sets.push(new Set(index.available));
+        }
+        // ...unless nothing else is left to filter by, as the query then matches no painting
+        if (terms.length && !sets.length) return [];
+        if (!sets.length) return null;
+
+        // Intersect, walking the smallest set
+        sets.sort((a, b) => a.size - b.size);
+        const result = [];
+        sets[0].forEach(i => {
+            if (sets.every(set => set.has(i))) result.push(i);
+        });
+        return result.sort((a, b) => a - b);
+    }
+
+    function setMatches(index, next) {
+        const nextSet = new Set(next || []);
+        const previousSet = new Set(matches || []);
+        (matches || []).forEach(i => {
+            if (!nextSet.has(i) && items[i]) items[i].classList.remove('match');
+        });
+        (next || []).forEach(i => {
+            if (previousSet.has(i)) return;
+            // Paged-out matches are marked as their page comes in
+            if (items[i]) items[i].classList.add('match'); else loadItem(i).catch(() => {});
+        });
+
+        const offsets = index.collections.map(([offset]) => offset);
+        const nextCollections = new Set((next || []).map(i => upperBound(offsets, i) - 1));
+        matchedCollections.forEach(c => {
+            if (!nextCollections.has(c)) {
+                collectionTitles[c].classList.remove('match');
+                collectionGrids[c].classList.remove('match');
+            }
+        });
+        nextCollections.forEach(c => {
+            collectionTitles[c].classList.add('match');
+            collectionGrids[c].classList.add('match');
+        });
+
+        matches = next;
+        matchedCollections = [...nextCollections];
+        gallery.classList.toggle('filtering', next !== null);
+        filterCount.textContent = next === null ? ''
+            : `${next.length} of ${totalItems} painting${totalItems === 1 ? '' : 's'}`;
+    }
+
+    async function applyFilter() {
+        const generation = ++searchGeneration;
+        let index;
+        try {
+            index = await loadSearchIndex();
+        } catch (error) {
+            console.error("Could not load search index:", error);
+            return;
+        }
+        // A later keystroke has already taken over
+        if (generation !== searchGeneration) return;
+        const maxPrice = filterPrice.value ? parseFloat(filterPrice.value) : null;
+        setMatches(index, findMatches(index, filterQuery.value, maxPrice, filterAvailable.checked));
     }
 
     function hideLightbox() {
@@ -124,23 +382,45 @@ document.addEventListener('DOMContentLoaded', () => {
         document.body.style.overflow = 'auto';
     }
 
+    // The painting after (1) or before (-1) index among all paintings, or among the
+    // matching ones while filtering
+    function neighbourOf(index, direction) {
+        if (!matches) {
+            return (index + direction + totalItems) % totalItems;
+        }
+        if (!matches.length) return index;
+        // Position of the painting among the matches, or just before/after it
+        const position = lowerBound(matches, index);
+        const current = matches[position] === index ? position : (direction > 0 ? position - 1 : position);
+        return matches[(current + direction + matches.length) % matches.length];
+    }
+
     function showNext() {
-        currentIndex = (currentIndex + 1) % allPaintings.length;
-        showLightbox(currentIndex);
+        showLightbox(neighbourOf(currentIndex, 1));
     }
 
     function showPrev() {
-        currentIndex = (currentIndex - 1 + allPaintings.length) % allPaintings.length;
-        showLightbox(currentIndex);
+        showLightbox(neighbourOf(currentIndex, -1));
+    }
+
+    // --- Offline Support ---
+    // sw.js precaches the page and its data; the thumbnails follow once the page has loaded
+    function registerServiceWorker() {
+        if (!('serviceWorker' in navigator)) return;
+        navigator.serviceWorker.register('sw.js')
+            .then(() => navigator.serviceWorker.ready)
+            .then(registration => registration.active.postMessage('precache-thumbnails'))
+            .catch(error => console.error("Could not register service worker:", error));
     }
 
     // --- Event Listeners ---
     function setupEventListeners() {
         gallery.addEventListener('click', (e) => {
             const item = e.target.closest('.gallery-item');
-            if (item) {
-                showLightbox(parseInt(item.dataset.index));
-            }
+            // Modified clicks keep the link's default, e.g. opening the image in a new tab
+            if (!item || e.button !== 0 || e.metaKey || e.ctrlKey || e.shiftKey || e.altKey) return;
+            e.preventDefault();
+            showLightbox(parseInt(item.dataset.index));
         });
 
         closeBtn.addEventListener('click', hideLightbox);
@@ -154,6 +434,17 @@ document.addEventListener('DOMContentLoaded', () => {
             }
         });
 
+        window.addEventListener('hashchange', openDeepLink);
+        window.addEventListener('load', registerServiceWorker);
+
+        // The filter form is hidden without JS, where it could not work
+        filterForm.hidden = false;
+        filterForm.addEventListener('submit', (e) => e.preventDefault());
+        filterForm.addEventListener('focusin', () => loadSearchIndex().catch(() => {}), { once: true });
+        filterQuery.addEventListener('input', applyFilter);
+        filterPrice.addEventListener('change', applyFilter);
+        filterAvailable.addEventListener('change', applyFilter);
+
         // Keyboard navigation
         document.addEventListener('keydown', (e) => {
             if (lightbox.classList.contains('show')) {
@@ -165,5 +456,8 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // --- Initial Load ---
-    loadGalleryData();
-});
\ No newline at end of file
+    addItems(gallery.querySelectorAll('.gallery-item'));
+    placeholders.forEach(placeholder => pageObserver.observe(placeholder));
+    setupEventListeners();
+    openDeepLink();
+});
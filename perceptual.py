@@ -0,0 +1,98 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "Pillow", "numpy>=2.0" ]
+# ///
+
+import io
+
+import numpy as np
+from PIL import Image
+
+SSIM_WINDOW = 8         # Side of the square (box) window SSIM statistics are taken over
+METRIC_MAX_SIDE = 1600  # Larger images are compared on luma box-reduced to this long side
+# Below 40 smooth gradients band, which SSIM hardly penalizes
+QUALITY_RANGE = (40, 95)
+# Trial encodings skip settings that only trade time for size, not pixels (JPEG Huffman
+# optimization) or barely change them (WebP's slowest method); the final encoding uses them
+PROBE_OPTIONS = {'jpeg': {'optimize': False, 'progressive': False}, 'webp': {'method': 4}}
+# Stabilizing constants of SSIM for 8-bit values
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+def luma(img, max_side=METRIC_MAX_SIDE):
+    """The image's luma as a float64 array, box-reduced by an integer factor to fit max_side."""
+    gray = img.convert('L')
+    factor = -(-max(gray.size) // max_side)
+    if factor > 1:
+        gray = gray.reduce(factor)
+    return np.asarray(gray, dtype=np.float64)
+
+def box_mean(a, size=SSIM_WINDOW):
+    """Mean over every size x size window of a 2-D array, from a summed-area table."""
+    table = np.zeros((a.shape[0] + 1, a.shape[1] + 1))
+    np.cumsum(np.cumsum(a, axis=0), axis=1, out=table[1:, 1:])
+    return (table[size:, size:] - table[:-size, size:] - table[size:, :-size] + table[:-size, :-size]) / (size * size)
+
+class LumaReference:
+    """
+    The unencoded image's luma and window statistics, computed once and compared
+    against every trial encoding of it.
+    """
+
+    def __init__(self, img):
+        self.luma = luma(img)
+        # Windows larger than a tiny image would leave nothing to compare
+        self.window = min(SSIM_WINDOW, *self.luma.shape)
+        self.mean = box_mean(self.luma, self.window)
+        self.variance = box_mean(self.luma * self.luma, self.window) - self.mean ** 2
+
+    def ssim(self, img):
+        """Mean SSIM of img against the reference (1.0 means identical)."""
+        other = luma(img)
+        mean = box_mean(other, self.window)
+        variance = box_mean(other * other, self.window) - mean ** 2
+        covariance = box_mean(self.luma * other, self.window) - self.mean * mean
+        ssim_map = ((2 * self.mean * mean + SSIM_C1) * (2 * covariance + SSIM_C2)
+                    / ((self.mean ** 2 + mean ** 2 + SSIM_C1) * (self.variance + variance + SSIM_C2)))
+        return float(ssim_map.mean())
+
+def encode(img, fmt, options):
+    """The image encoded in memory with Pillow save options; returns the bytes."""
+    buffer = io.BytesIO()
+    img.save(buffer, fmt.upper(), **options)
+    return buffer.getvalue()
+
+def encode_to_target(img, fmt, target, options, known=None, reference=None):
+    """
+    Encodes img as JPEG or WebP at the lowest quality whose SSIM against img reaches
+    target, found by binary search over QUALITY_RANGE; options are the format's
+    save options, and their quality is the fixed baseline the saving is measured against.
+    known is a record from an earlier search of the same source and settings, whose
+    quality is then used without searching again.
+    Returns (data, record) with record {quality, ssim, bytes, baseline_bytes}.
+    """
+    if known:
+        data = encode(img, fmt, {**options, "quality": known["quality"]})
+        return data, {**known, "bytes": len(data)}
+
+    reference = reference or LumaReference(img)
+    probe_options = {**options, **PROBE_OPTIONS.get(fmt, {})}
+    low, high = QUALITY_RANGE
+    # Even the highest quality may miss the target; it is used then
+    best = high, None
+    while low <= high:
+        quality = (low + high) // 2
+        with Image.open(io.BytesIO(encode(img, fmt, {**probe_options, "quality": quality}))) as decoded:
+            score = reference.ssim(decoded)
+        if score >= target:
+            best = quality, score
+            high = quality - 1
+        else:
+            low = quality + 1
+            if quality == QUALITY_RANGE[1]:
+                best = quality, score
+
+    quality, score = best
+    data = encode(img, fmt, {**options, "quality": quality})
+    baseline_bytes = len(encode(img, fmt, options))
+    return data, {"quality": quality, "ssim": round(score, 5), "bytes": len(data), "baseline_bytes": baseline_bytes}
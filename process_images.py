@@ -1,21 +1,597 @@
 # /// script
 # dependencies = [
 #   "Pillow",
+#   "numpy>=2.0",
 # ]
 # ///
 
 import os
-from PIL import Image, ImageOps
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image, ImageOps, features
 import glob
 
-def resize_images():
+import timing
+from timing import tracer, timed_call, StepTimer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+INPUT_DIR = 'images_raw/Studio sale 2/Studio sale 2'
+OUTPUT_DIR = 'images'
+MAX_WIDTH = 1200
+JPEG_QUALITY = 85
+CACHE_FILE = os.path.join('.build-cache', 'resize-cache.json')
+CACHE_VERSION = 1
+
+# Reduced-scale decode: JPEGs are decoded by libjpeg at 1/2, 1/4 or 1/8 scale
+# (never smaller than the target), then any remaining large factor is box-reduced
+# down to REDUCING_GAP times the target before the final LANCZOS pass
+REDUCING_GAP = 3.0
+# Address-space cap per worker process. Address space runs well ahead of resident memory,
+# so the worker count is bounded by WORKER_RESIDENT_MB, a worker's typical peak resident
+# size (about 100 MB resizing a 1200px image, more with --target-ssim), instead
+WORKER_MEMORY_MB = 1024
+WORKER_RESIDENT_MB = 256
+
+# Responsive derivatives generated from the gallery images
+GALLERY_DIR = 'images'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')  # Gallery images, matched case-insensitively
+DERIVED_DIR = 'derived'
+DERIVATIVE_WIDTHS = (320, 640, 1200)
+DERIVATIVE_FORMATS = {
+    # format: (extension, save options)
+    'avif': ('avif', {'quality': 55}),
+    'webp': ('webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Quality-targeted encoding (--target-ssim): JPEG and WebP outputs get, per image, the
+# lowest quality whose SSIM against the unencoded image reaches the target (perceptual.py)
+TARGET_SSIM = 0.96
+TARGETED_FORMATS = ('jpeg', 'webp')
+
+# Thumbnail atlases: one or a few sprite sheets per collection for the grid view
+ATLAS_DIR = os.path.join(DERIVED_DIR, 'atlas')
+ATLAS_TILE_HEIGHT = 320
+ATLAS_MAX_SIZE = 2560
+ATLAS_FORMAT = 'webp'
+
+def file_sha256(path):
+    """Returns the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_cache():
+    """Loads the resize cache, or returns an empty one if missing or outdated."""
+    if os.path.exists(CACHE_FILE):
+        try:
+            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get("version") == CACHE_VERSION:
+                return cache
+        except (OSError, ValueError):
+            pass
+    return {"version": CACHE_VERSION, "sources": {}, "outputs": {}}
+
+def save_cache(cache):
+    """Writes the resize cache to disk."""
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+
+def source_hash(cache, img_path):
+    """
+    Returns the content hash of a source image, reusing the cached hash when
+    the file's mtime and size have not changed since it was last hashed.
+    """
+    stat = os.stat(img_path)
+    entry = cache["sources"].get(img_path)
+    if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+        return entry["sha256"]
+    sha256 = file_sha256(img_path)
+    cache["sources"][img_path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}
+    return sha256
+
+def resize_key(sha256, params):
+    """Returns the cache key for a source hash combined with the resize parameters."""
+    return hashlib.sha256(json.dumps([sha256, params], sort_keys=True).encode('utf-8')).hexdigest()
+
+def is_cached(cache, output_path, key):
+    """True if output_path exists and was produced from the same source and parameters."""
+    entry = cache["outputs"].get(output_path)
+    if not entry or entry["key"] != key or not os.path.exists(output_path):
+        return False
+    stat = os.stat(output_path)
+    return entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size
+
+def oriented_size(img):
+    """Returns the (width, height) of an image after its EXIF orientation is applied."""
+    width, height = img.size
+    if img.getexif().get(0x0112) in (5, 6, 7, 8):
+        return height, width
+    return width, height
+
+def save_targeted(img, path, fmt, options, target, known=None, reference=None):
+    """
+    Saves img at the quality perceptual.encode_to_target() picks for target, or at
+    the quality of `known` (an earlier record for the same source and settings).
+    Returns the quality record.
+    """
+    from perceptual import encode_to_target
+    data, record = encode_to_target(img, fmt, target, options, known, reference)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return record
+
+def resize_one(img_path, output_path, params, known=None):
+    """
+    Resizes a single image to params["max_width"] and saves it as a JPEG.
+    With params["draft"], JPEGs are decoded at reduced scale in the DCT domain
+    first, so the full-resolution bitmap is never materialised.
+    With params["target_ssim"], the JPEG quality is searched per image instead;
+    known holds the quality records of an earlier search for the same source.
+    Runs in a worker process; returns a result dict, with seconds per decode,
+    resample and encode step, instead of raising.
+    """
+    start = time.perf_counter()
+    timer = StepTimer()
+    try:
+        with Image.open(img_path) as img:
+            # Calculate new height to maintain aspect ratio
+            max_width = params["max_width"]
+            width, height = oriented_size(img)
+            new_height = int(height * (max_width / float(width)))
+
+            if params.get("draft") and img.format == 'JPEG':
+                # draft() works on the stored (un-rotated) orientation
+                stored = (max_width, new_height) if img.size == (width, height) else (new_height, max_width)
+                img.draft(img.mode, stored)
+            with timer("decode"):
+                img.load()
+
+            with timer("resample"):
+                # Correct the orientation based on EXIF data
+                img = ImageOps.exif_transpose(img)
+
+                # Resize the image using a high-quality filter
+                img_resized = img.resize((max_width, new_height), Image.Resampling.LANCZOS,
+                                         reducing_gap=REDUCING_GAP if params.get("draft") else None)
+
+            # Save the resized image to the output directory
+            qualities = {}
+            with timer("encode"):
+                if params.get("target_ssim"):
+                    qualities["jpeg"] = save_targeted(img_resized, output_path, 'jpeg',
+                                                      {"quality": params["quality"], "optimize": True},
+                                                      params["target_ssim"], (known or {}).get("jpeg"))
+                else:
+                    img_resized.save(output_path, 'JPEG', quality=params["quality"], optimize=True)
+        return {"source": img_path, "output": output_path, "status": "processed",
+                "seconds": time.perf_counter() - start,
+                "bytes_read": os.path.getsize(img_path), "bytes_written": os.path.getsize(output_path),
+                "qualities": qualities, "steps": timer.steps}
+    except MemoryError:
+        return {"source": img_path, "output": output_path, "status": "failed",
+                "seconds": time.perf_counter() - start,
+                "error": "exceeded the per-worker memory limit"}
+    except Exception as e:
+        return {"source": img_path, "output": output_path, "status": "failed",
+                "seconds": time.perf_counter() - start, "error": str(e)}
+
+def known_qualities(cache, output, key):
+    """The quality records cached for output, if they came from the same source and parameters."""
+    entry = cache.get("qualities", {}).get(output)
+    return entry["records"] if entry and entry["key"] == key else None
+
+def store_qualities(cache, output, key, records):
+    if records:
+        cache.setdefault("qualities", {})[output] = {"key": key, "records": records}
+
+def print_quality_report(cache, outputs, target):
+    """
+    Prints the qualities the search chose for every output of the catalog (this run's
+    and cached ones) and their total size against encoding at the fixed qualities.
+    outputs maps output names to their cache keys.
+    """
+    records = [r for output, key in outputs.items() for r in (known_qualities(cache, output, key) or {}).values()]
+    if not records:
+        return
+    size = sum(r["bytes"] for r in records)
+    baseline = sum(r["baseline_bytes"] for r in records)
+    qualities = sorted(r["quality"] for r in records)
+    print(f"\nQuality search (target SSIM {target}): {len(records)} encodings at quality "
+          f"{qualities[0]}-{qualities[-1]} (median {qualities[len(qualities) // 2]}).")
+    print(f"{size / 1e6:.1f} MB against {baseline / 1e6:.1f} MB at the fixed qualities: "
+          f"{(baseline - size) / 1e6:.1f} MB ({(baseline - size) / baseline:.0%}) saved.")
+
+def limit_worker_memory(limit_mb):
+    """
+    Pool initializer: caps the address space of a worker process at limit_mb (0 for
+    no cap). Serial runs (-j 1) do the work in the main process and are not capped.
+    """
+    if resource is None or not limit_mb:
+        return
+    limit = limit_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+def available_memory():
+    """
+    Bytes that can be allocated without swapping: MemAvailable, which counts the
+    reclaimable page cache, not just free pages. None when it cannot be read.
+    """
+    try:
+        with open('/proc/meminfo', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # Kernels before 3.14 and other systems: free pages only, an underestimate
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def clamp_workers(workers, resident_mb=WORKER_RESIDENT_MB):
+    """Reduces the worker count so that workers * resident_mb fits in the available memory."""
+    available = available_memory()
+    if available is None or resident_mb <= 0:
+        return workers
+    return max(1, min(workers, available // (resident_mb * 1024 * 1024)))
+
+def run_jobs(func, jobs, workers, initializer=None, initargs=()):
+    """
+    Calls func(*job) for every job, spread over a process pool when more than
+    one worker is requested. Returns the results in completion order, each
+    stamped by timing.timed_call with its start time and worker pid.
+    """
+    results = []
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+            futures = [pool.submit(timed_call, func, *job) for job in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+    else:
+        for job in jobs:
+            results.append(timed_call(func, *job))
+    return results
+
+def available_formats():
+    """Returns the derivative formats this Pillow build can encode."""
+    return [fmt for fmt in DERIVATIVE_FORMATS if fmt == 'jpeg' or features.check(fmt)]
+
+def derive_one(img_path, relative_path, output_dir, params, known=None):
+    """
+    Writes every width/format derivative of one gallery image.
+    With params["target_ssim"], JPEG and WebP qualities are searched per variant;
+    known holds the quality records of an earlier search for the same source.
+    Runs in a worker process; the result carries the manifest entry
+    (source dimensions plus one record per variant file) and the seconds per step.
+    """
+    start = time.perf_counter()
+    timer = StepTimer()
+    try:
+        stem, _ = os.path.splitext(relative_path)
+        os.makedirs(os.path.join(output_dir, os.path.dirname(relative_path)), exist_ok=True)
+        variants = []
+        qualities = {}
+        with Image.open(img_path) as img:
+            with timer("decode"):
+                img.load()
+            with timer("resample"):
+                img = ImageOps.exif_transpose(img).convert('RGB')
+            width, height = img.size
+            # Never upscale: widths larger than the source collapse onto the source width
+            widths = sorted({min(w, width) for w in params["widths"]})
+            for w in widths:
+                h = max(1, round(height * w / width))
+                with timer("resample"):
+                    resized = img if w == width else img.resize((w, h), Image.Resampling.LANCZOS)
+                reference = None
+                for fmt in params["formats"]:
+                    ext, options = DERIVATIVE_FORMATS[fmt]
+                    file = f"{output_dir}/{stem}-{w}.{ext}"
+                    with timer("encode"):
+                        if params.get("target_ssim") and fmt in TARGETED_FORMATS:
+                            from perceptual import LumaReference
+                            # Both formats of a width are compared against the same reference
+                            reference = reference or LumaReference(resized)
+                            qualities[f"{fmt}-{w}"] = save_targeted(resized, file, fmt, options, params["target_ssim"],
+                                                                    (known or {}).get(f"{fmt}-{w}"), reference)
+                        else:
+                            resized.save(file, fmt.upper(), **options)
+                    variants.append({"file": file, "format": fmt, "width": w, "height": h,
+                                     "bytes": os.path.getsize(file)})
+        return {"source": img_path, "output": relative_path, "status": "processed",
+                "seconds": time.perf_counter() - start,
+                "bytes_read": os.path.getsize(img_path), "bytes_written": sum(v["bytes"] for v in variants),
+                "entry": {"width": width, "height": height, "variants": variants}, "qualities": qualities,
+                "steps": timer.steps}
+    except Exception as e:
+        return {"source": img_path, "output": relative_path, "status": "failed",
+                "seconds": time.perf_counter() - start, "error": str(e)}
+
+def load_derived_manifest(manifest_file):
+    """Loads the derivative manifest written by generate_derivatives()."""
+    if os.path.exists(manifest_file):
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def is_image_name(name):
+    """Whether a file name is a gallery image; build.py and watch.py use the same test."""
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+def list_gallery_images(images_dir=GALLERY_DIR):
+    """Returns the sorted paths of every gallery image in the collection folders of images_dir."""
+    paths = []
+    for collection in os.scandir(images_dir):
+        if collection.is_dir():
+            paths.extend(entry.path for entry in os.scandir(collection.path)
+                         if entry.is_file() and is_image_name(entry.name))
+    return sorted(paths)
+
+def generate_derivatives(images_dir=GALLERY_DIR, output_dir=DERIVED_DIR, widths=DERIVATIVE_WIDTHS,
+                         workers=None, force=False, only=None, target_ssim=None):
+    """
+    Generates responsive derivatives (several widths, JPEG plus WebP/AVIF where
+    supported) for every gallery image and records them in derived/manifest.json,
+    which build.py merges into gallery-data.json.
+    `only` restricts the run to the given relative paths ("collection/file.jpg");
+    manifest entries for other images are left as they are.
+    target_ssim searches JPEG and WebP qualities per variant instead of using fixed ones.
+    Returns the list of per-image result dicts.
+    """
+    start = time.perf_counter()
+    manifest_file = os.path.join(output_dir, 'manifest.json')
+    if only is not None:
+        image_paths = sorted(os.path.join(images_dir, rel) for rel in only
+                             if os.path.isfile(os.path.join(images_dir, rel)))
+    else:
+        image_paths = list_gallery_images(images_dir) if os.path.isdir(images_dir) else []
+    if not image_paths and only is None:
+        print(f"No gallery images found in '{images_dir}'.")
+        return []
+
+    formats = available_formats()
+    print(f"Found {len(image_paths)} gallery images, generating {list(widths)} x {formats}...")
+
+    cache = load_cache()
+    derived = load_derived_manifest(manifest_file)
+    params = {"widths": list(widths), "formats": formats, "version": CACHE_VERSION}
+    if target_ssim:
+        params["target_ssim"] = target_ssim
+    keys = {}
+    results = []
+    jobs = []
+    with tracer.stage("hash") as span:
+        for img_path in image_paths:
+            relative_path = os.path.relpath(img_path, images_dir).replace(os.sep, '/')
+            keys[relative_path] = resize_key(source_hash(cache, img_path), params)
+            entry = derived.get(relative_path)
+            if (not force and entry and entry.get("key") == keys[relative_path]
+                    and all(os.path.exists(v["file"]) for v in entry["variants"])):
+                results.append({"source": img_path, "output": relative_path, "status": "skipped", "seconds": 0.0})
+            else:
+                known = known_qualities(cache, f"{output_dir}/{relative_path}", keys[relative_path])
+                jobs.append((img_path, relative_path, output_dir, params, known))
+        span["items"] = len(image_paths)
+
+    workers = workers or os.cpu_count() or 1
+    if jobs:
+        print(f"Deriving {len(jobs)} image(s) with {min(workers, len(jobs))} worker(s)...")
+    with tracer.stage("derive", workers=min(workers, len(jobs))) as span:
+        derived_results = run_jobs(derive_one, jobs, workers)
+        tracer.items(span, derived_results)
+    results.extend(derived_results)
+
+    for r in results:
+        if r["status"] == "processed":
+            derived[r["output"]] = {"key": keys[r["output"]], **r["entry"]}
+            store_qualities(cache, f"{output_dir}/{r['output']}", keys[r["output"]], r["qualities"])
+    # Drop entries for gallery images that no longer exist
+    stale = set(only) - set(keys) if only is not None else set(derived) - set(keys)
+    derived = {rel: derived[rel] for rel in sorted(derived) if rel not in stale}
+
+    with tracer.stage("manifest") as span:
+        os.makedirs(output_dir, exist_ok=True)
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(derived, f, indent=1)
+        save_cache(cache)
+        span["bytes_written"] = os.path.getsize(manifest_file)
+
+    print_summary(results, time.perf_counter() - start)
+    total = sum(v["bytes"] for entry in derived.values() for v in entry["variants"])
+    print(f"Derivative manifest written to '{manifest_file}' ({total / 1e6:.1f} MB of variants).")
+    if target_ssim:
+        print_quality_report(cache, {f"{output_dir}/{rel}": key for rel, key in keys.items()}, target_ssim)
+    return results
+
+def pack_shelves(sizes, max_size):
+    """
+    Packs equal-height tiles left to right into shelves, starting a new sheet
+    whenever a sheet would exceed max_size x max_size.
+    Returns ([(sheet, x, y) per tile], [[width, height] per sheet]).
+    """
+    placements = []
+    sheets = []
+    x = y = 0
+    for w, h in sizes:
+        if sheets and x + w > max_size:
+            x, y = 0, sheets[-1][1]
+        if not sheets or y + h > max_size:
+            sheets.append([0, 0])
+            x = y = 0
+        placements.append((len(sheets) - 1, x, y))
+        x += w
+        sheets[-1][0] = max(sheets[-1][0], x)
+        sheets[-1][1] = max(sheets[-1][1], y + h)
+    return placements, sheets
+
+def atlas_one(collection, image_paths, output_dir, params):
+    """
+    Builds the sprite sheet(s) for one collection. Runs in a worker process;
+    the result carries the sheets, a {relative_path: [sheet, x, y, w, h]} map and
+    the seconds per step.
+    """
+    start = time.perf_counter()
+    timer = StepTimer()
+    try:
+        tile_height, max_size = params["tile_height"], params["max_size"]
+        tiles = []
+        for img_path in image_paths:
+            with Image.open(img_path) as img:
+                width, height = oriented_size(img)
+                w = min(max_size, max(1, round(width * tile_height / height)))
+                h = min(tile_height, max(1, round(height * w / width)))
+                img.draft('RGB', (w, h) if img.size == (width, height) else (h, w))
+                with timer("decode"):
+                    img.load()
+                with timer("resample"):
+                    tiles.append(ImageOps.exif_transpose(img).convert('RGB').resize((w, h), Image.Resampling.LANCZOS))
+
+        placements, sheet_sizes = pack_shelves([t.size for t in tiles], max_size)
+        sheets = [Image.new('RGB', tuple(size), (240, 240, 240)) for size in sheet_sizes]
+        tile_map = {}
+        for img_path, tile, (sheet, x, y) in zip(image_paths, tiles, placements):
+            sheets[sheet].paste(tile, (x, y))
+            relative_path = f"{collection}/{os.path.basename(img_path)}"
+            tile_map[relative_path] = [sheet, x, y, tile.width, tile.height]
+
+        sheet_entries = []
+        for i, sheet in enumerate(sheets):
+            file = f"{output_dir}/{collection}-{i}.{params['format']}"
+            with timer("encode"):
+                sheet.save(file, params["format"].upper(), **DERIVATIVE_FORMATS[params["format"]][1])
+            sheet_entries.append({"file": file, "width": sheet.width, "height": sheet.height,
+                                  "bytes": os.path.getsize(file)})
+        return {"source": collection, "output": collection, "status": "processed",
+                "seconds": time.perf_counter() - start,
+                "bytes_read": sum(os.path.getsize(p) for p in image_paths),
+                "bytes_written": sum(sheet["bytes"] for sheet in sheet_entries),
+                "entry": {"sheets": sheet_entries, "tiles": tile_map}, "steps": timer.steps}
+    except Exception as e:
+        return {"source": collection, "output": collection, "status": "failed",
+                "seconds": time.perf_counter() - start, "error": str(e)}
+
+def print_atlas_report(atlas, images_dir):
+    """Compares grid requests and bytes for per-file tiles versus the atlas sheets."""
+    derived = load_derived_manifest(os.path.join(DERIVED_DIR, 'manifest.json'))
+    print(f"\n{'collection':<28} {'per-file':>18} {'atlas':>18}")
+    totals = [0, 0, 0, 0]
+    for collection, entry in atlas["collections"].items():
+        file_requests = len(entry["tiles"])
+        file_bytes = 0
+        for relative_path in entry["tiles"]:
+            # Per-file mode loads the smallest WebP variant when derivatives exist, else the gallery image
+            variants = [v for v in derived.get(relative_path, {}).get("variants", []) if v["format"] == ATLAS_FORMAT]
+            if variants:
+                file_bytes += min(variants, key=lambda v: v["width"])["bytes"]
+            else:
+                file_bytes += os.path.getsize(os.path.join(images_dir, relative_path))
+        atlas_requests = len(entry["sheets"])
+        atlas_bytes = sum(sheet["bytes"] for sheet in entry["sheets"])
+        for i, value in enumerate((file_requests, file_bytes, atlas_requests, atlas_bytes)):
+            totals[i] += value
+        print(f"{collection:<28} {file_requests:>4} req {file_bytes / 1e3:>8.0f}KB "
+              f"{atlas_requests:>4} req {atlas_bytes / 1e3:>8.0f}KB")
+    print(f"{'total':<28} {totals[0]:>4} req {totals[1] / 1e3:>8.0f}KB "
+          f"{totals[2]:>4} req {totals[3] / 1e3:>8.0f}KB")
+
+def generate_atlases(images_dir=GALLERY_DIR, output_dir=ATLAS_DIR, workers=None, force=False):
+    """
+    Packs each collection's grid thumbnails into sprite sheets under derived/atlas/
+    and writes derived/atlas/atlas.json, the coordinate map app.js renders tiles from.
+    Collections whose images and parameters are unchanged are skipped.
+    Returns the list of per-collection result dicts.
+    """
+    start = time.perf_counter()
+    map_file = os.path.join(output_dir, 'atlas.json')
+    os.makedirs(output_dir, exist_ok=True)
+    image_paths = list_gallery_images(images_dir) if os.path.isdir(images_dir) else []
+    collections = {}
+    for img_path in image_paths:
+        collections.setdefault(os.path.basename(os.path.dirname(img_path)), []).append(img_path)
+
+    cache = load_cache()
+    atlas = load_derived_manifest(map_file) or {"collections": {}}
+    params = {"tile_height": ATLAS_TILE_HEIGHT, "max_size": ATLAS_MAX_SIZE, "format": ATLAS_FORMAT,
+              "version": CACHE_VERSION}
+    keys = {}
+    results = []
+    jobs = []
+    with tracer.stage("hash") as span:
+        for collection, paths in collections.items():
+            keys[collection] = resize_key([source_hash(cache, p) for p in paths], params)
+            entry = atlas["collections"].get(collection)
+            if (not force and entry and entry.get("key") == keys[collection]
+                    and all(os.path.exists(sheet["file"]) for sheet in entry["sheets"])):
+                results.append({"source": collection, "output": collection, "status": "skipped", "seconds": 0.0})
+            else:
+                jobs.append((collection, paths, output_dir, params))
+        span["items"] = len(image_paths)
+
+    workers = workers or os.cpu_count() or 1
+    if jobs:
+        print(f"Packing {len(jobs)} collection atlas(es) with {min(workers, len(jobs))} worker(s)...")
+    with tracer.stage("atlas", workers=min(workers, len(jobs))) as span:
+        packed = run_jobs(atlas_one, jobs, workers)
+        tracer.items(span, packed)
+    results.extend(packed)
+
+    for r in results:
+        if r["status"] == "processed":
+            atlas["collections"][r["output"]] = {"key": keys[r["output"]], **r["entry"]}
+    atlas = {"tile_height": ATLAS_TILE_HEIGHT,
+             "collections": {c: atlas["collections"][c] for c in sorted(atlas["collections"]) if c in keys}}
+    with tracer.stage("map") as span:
+        with open(map_file, 'w', encoding='utf-8') as f:
+            json.dump(atlas, f, separators=(',', ':'))
+        save_cache(cache)
+        span["bytes_written"] = os.path.getsize(map_file)
+
+    print_summary(results, time.perf_counter() - start)
+    print_atlas_report(atlas, images_dir)
+    return results
+
+def print_summary(results, elapsed):
+    """Prints a per-image result table followed by processed/skipped/failed totals."""
+    counts = {"processed": 0, "skipped": 0, "failed": 0}
+    for r in sorted(results, key=lambda r: r["source"]):
+        counts[r["status"]] += 1
+        line = f"  {r['status']:<9} {r['seconds']:6.2f}s  {os.path.basename(r['source'])}"
+        if r.get("error"):
+            line += f"  ({r['error']})"
+        print(line)
+    print(f"\nDone in {elapsed:.2f}s: {counts['processed']} processed, "
+          f"{counts['skipped']} skipped, {counts['failed']} failed.")
+
+def resize_images(input_dir=INPUT_DIR, output_dir=OUTPUT_DIR, max_width=MAX_WIDTH,
+                  workers=None, force=False, draft=True, memory_mb=WORKER_MEMORY_MB, target_ssim=None):
     """
     Resizes all JPG images from an input directory to a max width of 1200px,
     maintaining aspect ratio, and saves them to an output directory.
+    Images whose source content and resize parameters match the cache are
+    skipped; the rest are spread over `workers` processes (default: all cores,
+    reduced so each worker gets WORKER_RESIDENT_MB of available memory), each
+    with its address space capped at memory_mb. memory_mb=0 turns off both the cap
+    and the reduction; serial runs are never capped.
+    target_ssim searches the JPEG quality per image instead of using JPEG_QUALITY.
+    Returns the list of per-image result dicts.
     """
-    input_dir = 'images_raw/Studio sale 2/Studio sale 2'
-    output_dir = 'images'
-    max_width = 1200
+    start = time.perf_counter()
 
     # Create the output directory if it doesn't exist
     if not os.path.exists(output_dir):
@@ -23,38 +599,86 @@ def resize_images():
         print(f"Created directory: {output_dir}")
 
     # Find all JPG files in the input directory
-    image_paths = glob.glob(os.path.join(input_dir, '*.jpg'))
+    image_paths = sorted(glob.glob(os.path.join(input_dir, '*.jpg')))
 
     if not image_paths:
         print(f"No JPG images found in '{input_dir}'.")
-        return
+        return []
 
     print(f"Found {len(image_paths)} images to process...")
 
-    for img_path in image_paths:
-        try:
-            with Image.open(img_path) as img:
-                # Correct the orientation based on EXIF data
-                img = ImageOps.exif_transpose(img)
+    cache = load_cache()
+    params = {"max_width": max_width, "quality": JPEG_QUALITY, "draft": draft, "version": CACHE_VERSION}
+    if target_ssim:
+        params["target_ssim"] = target_ssim
+    results = []
+    pending = []
+    outputs = {}
+    with tracer.stage("hash") as span:
+        for img_path in image_paths:
+            output_path = os.path.join(output_dir, os.path.basename(img_path))
+            key = resize_key(source_hash(cache, img_path), params)
+            outputs[output_path] = key
+            if not force and is_cached(cache, output_path, key):
+                results.append({"source": img_path, "output": output_path, "status": "skipped", "seconds": 0.0})
+            else:
+                pending.append((img_path, output_path, key))
+        span["items"] = len(image_paths)
 
-                # Calculate new height to maintain aspect ratio
-                width_percent = (max_width / float(img.size[0]))
-                new_height = int((float(img.size[1]) * float(width_percent)))
-                
-                # Resize the image using a high-quality filter
-                img_resized = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Get the original filename
-                filename = os.path.basename(img_path)
-                
-                # Save the resized image to the output directory
-                output_path = os.path.join(output_dir, filename)
-                img_resized.save(output_path, 'JPEG', quality=85, optimize=True)
-                
-                print(f"Processed and saved: {output_path}")
-
-        except Exception as e:
-            print(f"Error processing {img_path}: {e}")
+    workers = workers or os.cpu_count() or 1
+    if memory_mb:
+        workers = clamp_workers(workers, min(memory_mb, WORKER_RESIDENT_MB))
+    keys = {output_path: key for _, output_path, key in pending}
+    if pending:
+        print(f"Resizing {len(pending)} image(s) with {min(workers, len(pending))} worker(s)...")
+    with tracer.stage("resize", workers=min(workers, len(pending))) as span:
+        resized = run_jobs(resize_one, [(img_path, output_path, params, known_qualities(cache, output_path, key))
+                                        for img_path, output_path, key in pending],
+                           workers, limit_worker_memory, (memory_mb,))
+        tracer.items(span, resized)
+    results.extend(resized)
+
+    with tracer.stage("cache"):
+        for r in results:
+            if r["status"] == "processed":
+                stat = os.stat(r["output"])
+                cache["outputs"][r["output"]] = {"key": keys[r["output"]],
+                                                "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+                store_qualities(cache, r["output"], keys[r["output"]], r["qualities"])
+        save_cache(cache)
+
+    print_summary(results, time.perf_counter() - start)
+    if target_ssim:
+        print_quality_report(cache, outputs, target_ssim)
+    return results
 
 if __name__ == '__main__':
-    resize_images()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Resize raw painting photos for the gallery.")
+    parser.add_argument('--input', default=INPUT_DIR, help="directory of source JPGs")
+    parser.add_argument('--output', default=OUTPUT_DIR, help="directory to write resized JPGs")
+    parser.add_argument('--max-width', type=int, default=MAX_WIDTH, help="output width in pixels")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="ignore the cache and resize every image")
+    parser.add_argument('--no-draft', action='store_true',
+                        help="decode sources at full resolution instead of reduced-scale JPEG decoding")
+    parser.add_argument('--worker-memory', type=int, default=WORKER_MEMORY_MB,
+                        help="address-space cap per pool worker in MB, 0 for none; "
+                             "not applied with -j 1 (default: %(default)s)")
+    parser.add_argument('--derivatives', action='store_true',
+                        help=f"generate responsive derivatives of '{GALLERY_DIR}' into '{DERIVED_DIR}' instead")
+    parser.add_argument('--target-ssim', type=float, nargs='?', const=TARGET_SSIM, default=None, metavar='SSIM',
+                        help="search JPEG/WebP quality per image for this SSIM against the unencoded "
+                             f"image instead of using fixed qualities (default target: {TARGET_SSIM})")
+    parser.add_argument('--atlas', action='store_true',
+                        help=f"pack grid thumbnails of '{GALLERY_DIR}' into sprite sheets in '{ATLAS_DIR}' instead")
+    timing.add_arguments(parser)
+    args = parser.parse_args()
+    timing.configure(args, "derivatives" if args.derivatives else "atlas" if args.atlas else "resize")
+    if args.derivatives:
+        generate_derivatives(workers=args.workers, force=args.force, target_ssim=args.target_ssim)
+    elif args.atlas:
+        generate_atlases(workers=args.workers, force=args.force)
+    else:
+        resize_images(args.input, args.output, args.max_width, args.workers, args.force,
+                      draft=not args.no_draft, memory_mb=args.worker_memory, target_ssim=args.target_ssim)
+    tracer.report()
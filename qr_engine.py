@@ -0,0 +1,266 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "qrcode[pil]", "numpy" ]
+# ///
+
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import qrcode
+from qrcode.image.styledpil import StyledPilImage
+from qrcode.image.styles.moduledrawers.pil import (
+    CircleModuleDrawer,
+    RoundedModuleDrawer,
+    GappedSquareModuleDrawer,
+    SquareModuleDrawer,
+    VerticalBarsDrawer,
+    HorizontalBarsDrawer
+)
+
+from timing import tracer, timed_call
+from qr_vector import render_svg, render_pdf
+from qr_masks import (
+    FastSolidFillColorMask,
+    FastSquareGradiantColorMask,
+    FastRadialGradiantColorMask,
+    FastHorizontalGradiantColorMask,
+    FastVerticalGradiantColorMask
+)
+
+URL = "https://ninjalevel.github.io/art-sale-2025/"
+ERROR_CORRECTION = qrcode.constants.ERROR_CORRECT_H
+ENGINE_VERSION = 1
+FORMATS = ("png", "svg", "pdf")
+
+# Module drawers by name
+DRAWERS = {
+    "Circle": CircleModuleDrawer,
+    "Rounded": RoundedModuleDrawer,
+    "Gapped": GappedSquareModuleDrawer,
+    "Square": SquareModuleDrawer,
+    "VBars": VerticalBarsDrawer,
+    "HBars": HorizontalBarsDrawer,
+}
+
+# Color masks by name: (class, keyword for c1, keyword for c2).
+# The vectorized masks from qr_masks.py are pixel-identical to qrcode's own.
+MASKS = {
+    "Solid": (FastSolidFillColorMask, "front_color", None),
+    "Radial": (FastRadialGradiantColorMask, "center_color", "edge_color"),
+    "Vertical": (FastVerticalGradiantColorMask, "top_color", "bottom_color"),
+    "Horizontal": (FastHorizontalGradiantColorMask, "left_color", "right_color"),
+    "Square": (FastSquareGradiantColorMask, "center_color", "edge_color"),
+}
+
+# Color palettes - modern, artistic, vibrant
+PALETTES = [
+    # Vibrant gradients
+    {"name": "Purple-Blue", "c1": (88, 86, 214), "c2": (33, 150, 243)},
+    {"name": "Sunset", "c1": (255, 94, 77), "c2": (255, 175, 64)},
+    {"name": "Ocean", "c1": (0, 119, 182), "c2": (0, 180, 216)},
+    {"name": "Forest", "c1": (39, 174, 96), "c2": (22, 160, 133)},
+    {"name": "Pink-Purple", "c1": (253, 29, 29), "c2": (131, 58, 180)},
+    {"name": "Gold-Orange", "c1": (242, 153, 74), "c2": (242, 201, 76)},
+    {"name": "Teal-Green", "c1": (26, 188, 156), "c2": (142, 68, 173)},
+    {"name": "Red-Pink", "c1": (235, 77, 75), "c2": (255, 118, 117)},
+    {"name": "Deep-Purple", "c1": (106, 27, 154), "c2": (74, 35, 90)},
+    {"name": "Sky-Blue", "c1": (52, 152, 219), "c2": (155, 89, 182)},
+    # Monochrome variations
+    {"name": "Black", "c1": (0, 0, 0), "c2": (50, 50, 50)},
+    {"name": "Dark-Gray", "c1": (44, 62, 80), "c2": (52, 73, 94)},
+    {"name": "Navy", "c1": (25, 42, 86), "c2": (41, 128, 185)},
+    {"name": "Charcoal", "c1": (23, 32, 42), "c2": (69, 90, 100)},
+]
+
+def make_variant(file, drawer, mask, c1, c2=None, back=(255, 255, 255), embed=None, url=None):
+    """
+    Describes one styled QR image declaratively:
+    drawer (DRAWERS key) x mask (MASKS key) x colors x optional embedded image path.
+    A url gives the variant its own payload instead of the one shared by the batch.
+    """
+    variant = {"file": file, "drawer": drawer, "mask": mask, "c1": list(c1),
+               "c2": list(c2) if c2 else None, "back": list(back), "embed": embed}
+    if url:
+        variant["url"] = url
+    return variant
+
+def encode(url=URL, error_correction=ERROR_CORRECTION):
+    """Encodes the QR matrix once; every variant is drawn from the same QRCode."""
+    qr = qrcode.QRCode(error_correction=error_correction)
+    qr.add_data(url)
+    qr.make()
+    return qr
+
+def build_mask(variant):
+    """Instantiates the color mask described by a variant."""
+    mask_class, c1_name, c2_name = MASKS[variant["mask"]]
+    kwargs = {"back_color": tuple(variant["back"]), c1_name: tuple(variant["c1"])}
+    if c2_name:
+        kwargs[c2_name] = tuple(variant["c2"])
+    return mask_class(**kwargs)
+
+def with_format(variants, fmt):
+    """Returns the variants with their file extension switched to fmt (png, svg or pdf)."""
+    return [{**v, "file": f"{os.path.splitext(v['file'])[0]}.{fmt}"} for v in variants]
+
+def render_image(qr, variant):
+    """Draws one variant from an already-encoded QRCode and returns the image."""
+    return qr.make_image(
+        image_factory=StyledPilImage,
+        module_drawer=DRAWERS[variant["drawer"]](),
+        color_mask=build_mask(variant),
+        embeded_image_path=variant["embed"]
+    )
+
+_worker_qr = None
+
+def _init_worker(qr):
+    """Pool initializer: receives the encoded matrix once per worker process."""
+    global _worker_qr
+    _worker_qr = qr
+
+def render_variant(variant, output_dir):
+    """
+    Renders and saves one variant in a worker process, as PNG or, going by the
+    file extension, through the SVG/PDF vector backend. Returns a result dict instead of raising.
+    The file is written under a temporary name and renamed, so a failed render leaves
+    the previous one in place.
+    """
+    start = time.perf_counter()
+    path = os.path.join(output_dir, variant["file"])
+    partial = path + '.partial'
+    try:
+        fmt = os.path.splitext(path)[1].lower()
+        qr = encode(variant["url"], _worker_qr.error_correction) if "url" in variant else _worker_qr
+        if fmt == '.svg':
+            with open(partial, 'w', encoding='utf-8') as f:
+                f.write(render_svg(qr.get_matrix(), variant))
+        elif fmt == '.pdf':
+            with open(partial, 'wb') as f:
+                f.write(render_pdf(qr.get_matrix(), variant))
+        else:
+            render_image(qr, variant).save(partial, format='PNG')
+        os.replace(partial, path)
+        return {"file": variant["file"], "status": "rendered", "seconds": time.perf_counter() - start,
+                "bytes_written": os.path.getsize(path)}
+    except Exception as e:
+        if os.path.exists(partial):
+            os.remove(partial)
+        return {"file": variant["file"], "status": "failed", "seconds": time.perf_counter() - start,
+                "error": str(e)}
+
+def variant_key(variant, url, error_correction):
+    """Cache key for a variant: its description, the payload and the embedded image's content."""
+    digest = hashlib.sha256(json.dumps([ENGINE_VERSION, url, error_correction, variant],
+                                       sort_keys=True).encode('utf-8'))
+    if variant["embed"]:
+        with open(variant["embed"], 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def load_manifest(manifest_file):
+    """Loads a variant manifest ({"seed", "url", "variants": {file: {"key", "variant"}}})."""
+    if os.path.exists(manifest_file):
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {"variants": {}}
+
+def file_format(file):
+    """The format of a rendered file, from its extension ("png", "svg" or "pdf")."""
+    return os.path.splitext(file)[1][1:].lower()
+
+def prune_outputs(output_dir, previous, keep):
+    """
+    Removes the files of previous manifest entries that are not in keep, i.e. variants
+    a new plan dropped; files the manifest never recorded are left alone.
+    Returns how many were removed.
+    """
+    removed = 0
+    for file in previous:
+        path = os.path.join(output_dir, file)
+        if file not in keep and os.path.isfile(path):
+            os.remove(path)
+            removed += 1
+    return removed
+
+def render_variants(variants, output_dir, url=URL, seed=None, workers=None, force=False,
+                    error_correction=ERROR_CORRECTION):
+    """
+    Renders a list of variants into output_dir across a process pool, sharing one
+    encoded matrix (variants with their own "url" are encoded in the worker). output_dir/manifest.json records every variant with its cache key,
+    so a rerun only renders variants that are missing or whose description changed.
+    Earlier variants in the formats being rendered that are no longer planned are
+    removed; those in other formats are kept, so PNG, SVG and PDF sets can coexist.
+    Variants verify_qr.py --prune rejected are skipped while their key is unchanged,
+    unless force is set.
+    Returns the list of per-variant result dicts.
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_file = os.path.join(output_dir, 'manifest.json')
+    manifest = load_manifest(manifest_file)
+    rejected = manifest.get("rejected", {})
+
+    keys = {}
+    results = []
+    pending = []
+    with tracer.stage("keys") as span:
+        for variant in variants:
+            keys[variant["file"]] = variant_key(variant, url, error_correction)
+            previous = manifest["variants"].get(variant["file"])
+            if not force and rejected.get(variant["file"]) == keys[variant["file"]]:
+                results.append({"file": variant["file"], "status": "rejected", "seconds": 0.0})
+            elif (not force and previous and previous["key"] == keys[variant["file"]]
+                    and os.path.exists(os.path.join(output_dir, variant["file"]))):
+                results.append({"file": variant["file"], "status": "skipped", "seconds": 0.0})
+            else:
+                pending.append(variant)
+        span["items"] = len(variants)
+
+    qr = encode(url, error_correction)
+    workers = workers or os.cpu_count() or 1
+    if pending:
+        print(f"Rendering {len(pending)} of {len(variants)} variant(s) with {min(workers, len(pending))} worker(s)...")
+    with tracer.stage("render", workers=min(workers, len(pending))) as span:
+        rendered = []
+        if workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(qr,)) as pool:
+                futures = [pool.submit(timed_call, render_variant, variant, output_dir) for variant in pending]
+                for future in as_completed(futures):
+                    rendered.append(future.result())
+        else:
+            _init_worker(qr)
+            rendered.extend(timed_call(render_variant, variant, output_dir) for variant in pending)
+        tracer.items(span, rendered, key="file")
+    results.extend(rendered)
+
+    status = {r["file"]: r["status"] for r in results}
+    formats = {file_format(v["file"]) for v in variants}
+    previous = manifest["variants"]
+    entries = {file: entry for file, entry in previous.items() if file_format(file) not in formats}
+    for v in variants:
+        if status[v["file"]] == "rejected":
+            continue
+        if status[v["file"]] != "failed":
+            entries[v["file"]] = {"key": keys[v["file"]], "variant": v}
+        elif v["file"] in previous:
+            # The last good file is still there; its old key gets it re-rendered next run
+            entries[v["file"]] = previous[v["file"]]
+    manifest = {"seed": seed, "url": url, "variants": entries,
+                "rejected": {file: key for file, key in rejected.items()
+                             if status.get(file) == "rejected" or file_format(file) not in formats}}
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    removed = prune_outputs(output_dir, previous, entries)
+
+    counts = {"rendered": 0, "skipped": 0, "rejected": 0, "failed": 0}
+    for r in results:
+        counts[r["status"]] += 1
+        if r["status"] == "failed":
+            print(f"  [ERROR] {r['file']}: {r['error']}")
+    print(f"{counts['rendered']} rendered, {counts['skipped']} unchanged, {counts['rejected']} rejected, "
+          f"{counts['failed']} failed, {removed} stale removed in {time.perf_counter() - start:.2f}s.")
+    return results
@@ -0,0 +1,88 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "qrcode[pil]", "numpy" ]
+# ///
+
+import math
+
+import numpy as np
+from PIL import Image
+from qrcode.image.styles.colormasks import (
+    SolidFillColorMask,
+    SquareGradiantColorMask,
+    RadialGradiantColorMask,
+    HorizontalGradiantColorMask,
+    VerticalGradiantColorMask
+)
+
+class VectorizedColorMask:
+    """
+    Mixin replacing QRColorMask.apply_mask's per-pixel Python loop with array
+    operations. It reproduces the original arithmetic step for step (float64,
+    same operation order, int() truncation), so output is pixel-identical, except
+    that when back and paint color are equal modules take the foreground color.
+    Subclasses provide foreground(x, y, width) returning (norm, color1, color2)
+    for the gradient, or a constant color.
+    """
+
+    def apply_mask(self, image):
+        pixels = np.array(image)
+        back = np.array(self.back_color, dtype=np.float64)
+        paint = self.paint_color
+        is_background = np.all(pixels == np.array(self.back_color, dtype=pixels.dtype), axis=-1)
+
+        # Interpolation coefficient of each pixel between background and paint color,
+        # averaged over the channels where the two differ (QRColorMask.extrap_color)
+        channels = [i for i in range(len(self.back_color)) if self.back_color[i] != paint[i]]
+        height, width = is_background.shape
+        fg = self.foreground_array(width, height)
+        if channels:
+            norm = 0
+            for i in channels:
+                norm = norm + (pixels[..., i] - back[i]) / (paint[i] - back[i])
+            norm = (norm / len(channels))[..., np.newaxis]
+            blended = np.trunc(fg * norm + back * (1 - norm))
+        else:
+            # Nothing to interpolate between, so modules take the foreground color
+            blended = fg
+
+        result = np.where(is_background[..., np.newaxis], pixels, np.clip(blended, 0, 255)).astype(np.uint8)
+        image.paste(Image.fromarray(result, image.mode))
+
+    def foreground_array(self, width, height):
+        """Returns the integer foreground color of every pixel as a (height, width, channels) array."""
+        x = np.arange(width, dtype=np.float64)[np.newaxis, :]
+        y = np.arange(height, dtype=np.float64)[:, np.newaxis]
+        norm, color1, color2 = self.gradient(x, y, width)
+        norm = np.broadcast_to(norm, (height, width))[..., np.newaxis]
+        color1 = np.array(color1, dtype=np.float64)
+        color2 = np.array(color2, dtype=np.float64)
+        # QRColorMask.interp_color: int(n2 * norm + n1 * (1 - norm))
+        return np.trunc(color2 * norm + color1 * (1 - norm))
+
+class FastSolidFillColorMask(VectorizedColorMask, SolidFillColorMask):
+    def apply_mask(self, image):
+        if self.back_color == (255, 255, 255) and self.front_color == (0, 0, 0):
+            return
+        VectorizedColorMask.apply_mask(self, image)
+
+    def gradient(self, x, y, width):
+        return 0.0, self.front_color, self.front_color
+
+class FastRadialGradiantColorMask(VectorizedColorMask, RadialGradiantColorMask):
+    def gradient(self, x, y, width):
+        distance = np.sqrt((x - width / 2) ** 2 + (y - width / 2) ** 2) / (math.sqrt(2) * width / 2)
+        return distance, self.center_color, self.edge_color
+
+class FastSquareGradiantColorMask(VectorizedColorMask, SquareGradiantColorMask):
+    def gradient(self, x, y, width):
+        distance = np.maximum(np.abs(x - width / 2), np.abs(y - width / 2)) / (width / 2)
+        return distance, self.center_color, self.edge_color
+
+class FastHorizontalGradiantColorMask(VectorizedColorMask, HorizontalGradiantColorMask):
+    def gradient(self, x, y, width):
+        return x / width, self.left_color, self.right_color
+
+class FastVerticalGradiantColorMask(VectorizedColorMask, VerticalGradiantColorMask):
+    def gradient(self, x, y, width):
+        return y / width, self.top_color, self.bottom_color
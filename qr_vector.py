@@ -0,0 +1,290 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "qrcode[pil]" ]
+# ///
+
+import io
+import math
+import base64
+import functools
+import zlib
+
+from PIL import Image
+
+# Every module drawer reduces to rounded rectangles in module units:
+# (x, y, w, h, (top-left, top-right, bottom-right, bottom-left corner radii))
+GAP_RATIO = 0.8     # GappedSquareModuleDrawer size_ratio
+BAR_RATIO = 0.8     # Vertical/HorizontalBarsDrawer shrink
+EMBED_RATIO = 0.25  # StyledPilImage embedded_image_ratio
+EMBED_MAX_PX = 512  # Embedded paintings are downscaled to this before being inlined
+BEZIER_ARC = 0.5523  # Cubic Bezier control distance for a quarter circle of radius 1
+
+def module_shapes(matrix, drawer):
+    """
+    Returns the rounded-rectangle list that draws every dark module with the given drawer.
+    Like StyledPilImage, the three finder patterns ("eyes") are always drawn as squares.
+    """
+    n = len(matrix)
+    border = next(r for r in range(n) if any(matrix[r]))
+
+    def dark(r, c):
+        return 0 <= r < n and 0 <= c < n and matrix[r][c]
+
+    def square(r, c):
+        row, col, width = r - border, c - border, n - 2 * border
+        return drawer == "Square" or (row < 7 and col < 7) or (row < 7 and width - col < 8) \
+            or (width - row < 8 and col < 7)
+
+    shapes = []
+    for r in range(n):
+        c = 0
+        while c < n:
+            if not matrix[r][c]:
+                c += 1
+                continue
+            if square(r, c):
+                # Merge horizontal runs into one rectangle
+                start = c
+                while c < n and matrix[r][c] and square(r, c):
+                    c += 1
+                shapes.append((start, r, c - start, 1, (0, 0, 0, 0)))
+                continue
+            if drawer == "Circle":
+                shapes.append((c, r, 1, 1, (0.5, 0.5, 0.5, 0.5)))
+            elif drawer == "Gapped":
+                inset = (1 - GAP_RATIO) / 2
+                shapes.append((c + inset, r + inset, GAP_RATIO, GAP_RATIO, (0, 0, 0, 0)))
+            elif drawer == "Rounded":
+                # A corner is rounded when neither of its two sides touches another module
+                up, down, left, right = dark(r - 1, c), dark(r + 1, c), dark(r, c - 1), dark(r, c + 1)
+                radii = tuple(0 if a or b else 0.5 for a, b in ((up, left), (up, right), (down, right), (down, left)))
+                shapes.append((c, r, 1, 1, radii))
+            elif drawer == "VBars":
+                inset = (1 - BAR_RATIO) / 2
+                top = 0 if dark(r - 1, c) else BAR_RATIO / 2
+                bottom = 0 if dark(r + 1, c) else BAR_RATIO / 2
+                shapes.append((c + inset, r, BAR_RATIO, 1, (top, top, bottom, bottom)))
+            elif drawer == "HBars":
+                inset = (1 - BAR_RATIO) / 2
+                left = 0 if dark(r, c - 1) else BAR_RATIO / 2
+                right = 0 if dark(r, c + 1) else BAR_RATIO / 2
+                shapes.append((c, r + inset, 1, BAR_RATIO, (left, right, right, left)))
+            else:
+                raise ValueError(f"No vector drawer for '{drawer}'")
+            c += 1
+    return shapes
+
+@functools.lru_cache(maxsize=4096)
+def fmt(value):
+    """Formats a coordinate compactly (no trailing zeros). Coordinates repeat heavily, hence the cache."""
+    return f"{value + 0.0:.3f}".rstrip('0').rstrip('.') or '0'
+
+def svg_path(shapes):
+    """Serializes rounded rectangles as one SVG path using relative commands and arcs."""
+    parts = []
+    for x, y, w, h, (tl, tr, br, bl) in shapes:
+        d = [f"M{fmt(x + tl)} {fmt(y)}h{fmt(w - tl - tr)}"]
+        if tr:
+            d.append(f"a{fmt(tr)} {fmt(tr)} 0 0 1 {fmt(tr)} {fmt(tr)}")
+        d.append(f"v{fmt(h - tr - br)}")
+        if br:
+            d.append(f"a{fmt(br)} {fmt(br)} 0 0 1 {fmt(-br)} {fmt(br)}")
+        d.append(f"h{fmt(-(w - br - bl))}")
+        if bl:
+            d.append(f"a{fmt(bl)} {fmt(bl)} 0 0 1 {fmt(-bl)} {fmt(-bl)}")
+        d.append(f"v{fmt(-(h - bl - tl))}")
+        if tl:
+            d.append(f"a{fmt(tl)} {fmt(tl)} 0 0 1 {fmt(tl)} {fmt(-tl)}")
+        parts.append(''.join(d) + 'z')
+    return ''.join(parts)
+
+def pdf_path(shapes):
+    """Serializes rounded rectangles as PDF path operators (corners as cubic Beziers)."""
+    ops = []
+    for x, y, w, h, (tl, tr, br, bl) in shapes:
+        ops.append(f"{fmt(x + tl)} {fmt(y)} m {fmt(x + w - tr)} {fmt(y)} l")
+        if tr:
+            k = tr * BEZIER_ARC
+            ops.append(f"{fmt(x + w - tr + k)} {fmt(y)} {fmt(x + w)} {fmt(y + tr - k)} {fmt(x + w)} {fmt(y + tr)} c")
+        ops.append(f"{fmt(x + w)} {fmt(y + h - br)} l")
+        if br:
+            k = br * BEZIER_ARC
+            ops.append(f"{fmt(x + w)} {fmt(y + h - br + k)} {fmt(x + w - br + k)} {fmt(y + h)} {fmt(x + w - br)} {fmt(y + h)} c")
+        ops.append(f"{fmt(x + bl)} {fmt(y + h)} l")
+        if bl:
+            k = bl * BEZIER_ARC
+            ops.append(f"{fmt(x + bl - k)} {fmt(y + h)} {fmt(x)} {fmt(y + h - bl + k)} {fmt(x)} {fmt(y + h - bl)} c")
+        ops.append(f"{fmt(x)} {fmt(y + tl)} l")
+        if tl:
+            k = tl * BEZIER_ARC
+            ops.append(f"{fmt(x)} {fmt(y + tl - k)} {fmt(x + tl - k)} {fmt(y)} {fmt(x + tl)} {fmt(y)} c")
+        ops.append("h")
+    return '\n'.join(ops)
+
+def gradient_fills(variant, size):
+    """
+    Describes the variant's color mask as vector fills over a size x size square:
+    a list of (region polygon or None for everywhere, kind, start point, end point or radius, c1, c2)
+    matching the qrcode gradient masks' geometry.
+    """
+    c1 = tuple(variant["c1"])
+    c2 = tuple(variant["c2"]) if variant["c2"] else c1
+    half = size / 2
+    mask = variant["mask"]
+    if mask == "Solid":
+        return [(None, "solid", None, None, c1, c1)]
+    if mask == "Horizontal":
+        return [(None, "linear", (0, 0), (size, 0), c1, c2)]
+    if mask == "Vertical":
+        return [(None, "linear", (0, 0), (0, size), c1, c2)]
+    if mask == "Radial":
+        return [(None, "radial", (half, half), math.sqrt(2) * half, c1, c2)]
+    if mask == "Square":
+        # Chebyshev distance: four triangles, each a linear gradient from the center to its edge
+        center = (half, half)
+        corners = [(0, 0), (size, 0), (size, size), (0, size)]
+        edges = [(half, 0), (size, half), (half, size), (0, half)]
+        return [([center, corners[i], corners[(i + 1) % 4]], "linear", center, edges[i], c1, c2)
+                for i in range(4)]
+    raise ValueError(f"No vector fill for mask '{mask}'")
+
+def embed_geometry(size):
+    """Returns (offset, width) of the embedded image in module units, snapped like StyledPilImage."""
+    box = 10  # StyledPilImage rounds the logo offset to whole modules; any box size gives the same result
+    total = size * box
+    logo_width_ish = int(total * EMBED_RATIO)
+    offset = int((int(total / 2) - int(logo_width_ish / 2)) / box) * box
+    return offset / box, (total - offset * 2) / box
+
+def embed_jpeg(path):
+    """Returns the embedded painting as downscaled JPEG bytes."""
+    with Image.open(path) as img:
+        img = img.convert('RGB')
+        img.thumbnail((EMBED_MAX_PX, EMBED_MAX_PX))
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=80)
+        return buffer.getvalue()
+
+def hex_color(color):
+    return '#' + ''.join(f"{v:02x}" for v in color[:3])
+
+def render_svg(matrix, variant, physical_size="60mm"):
+    """Renders a variant as a standalone SVG document (resolution independent)."""
+    size = len(matrix)
+    shapes = module_shapes(matrix, variant["drawer"])
+    # The module outline is defined once and filled by reference; only the square
+    # gradient's four triangles need clip paths
+    defs = [f'<path id="m" d="{svg_path(shapes)}"/>']
+    body = [f'<rect width="{size}" height="{size}" fill="{hex_color(variant["back"])}"/>']
+    for i, (region, kind, start, end, c1, c2) in enumerate(gradient_fills(variant, size)):
+        if kind == "solid":
+            fill = hex_color(c1)
+        else:
+            stops = f'<stop offset="0" stop-color="{hex_color(c1)}"/><stop offset="1" stop-color="{hex_color(c2)}"/>'
+            if kind == "linear":
+                defs.append(f'<linearGradient id="g{i}" gradientUnits="userSpaceOnUse" x1="{fmt(start[0])}" '
+                            f'y1="{fmt(start[1])}" x2="{fmt(end[0])}" y2="{fmt(end[1])}">{stops}</linearGradient>')
+            else:
+                defs.append(f'<radialGradient id="g{i}" gradientUnits="userSpaceOnUse" cx="{fmt(start[0])}" '
+                            f'cy="{fmt(start[1])}" r="{fmt(end)}">{stops}</radialGradient>')
+            fill = f"url(#g{i})"
+        if region:
+            points = ' '.join(f"{fmt(px)},{fmt(py)}" for px, py in region)
+            defs.append(f'<clipPath id="r{i}"><polygon points="{points}"/></clipPath>')
+            body.append(f'<use href="#m" fill="{fill}" clip-path="url(#r{i})"/>')
+        else:
+            body.append(f'<use href="#m" fill="{fill}"/>')
+    if variant["embed"]:
+        offset, width = embed_geometry(size)
+        data = base64.b64encode(embed_jpeg(variant["embed"])).decode('ascii')
+        body.append(f'<image x="{fmt(offset)}" y="{fmt(offset)}" width="{fmt(width)}" height="{fmt(width)}" '
+                    f'preserveAspectRatio="none" href="data:image/jpeg;base64,{data}"/>')
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+            f'width="{physical_size}" height="{physical_size}" shape-rendering="geometricPrecision">'
+            f'<defs>{"".join(defs)}</defs>{"".join(body)}</svg>')
+
+def render_pdf(matrix, variant, page_points=170):
+    """
+    Renders a variant as a single-page PDF (page_points square, 170pt = 60mm) with
+    the gradients as native axial/radial shadings clipped to the module outlines.
+    """
+    size = len(matrix)
+    scale = page_points / size
+    shapes = pdf_path(module_shapes(matrix, variant["drawer"]))
+    objects = []  # PDF objects 1..n; 1 = catalog, 2 = pages, 3 = page
+
+    def rgb(color):
+        return ' '.join(fmt(v / 255) for v in color[:3])
+
+    # Flip to a top-left origin in module units so the geometry matches the SVG backend
+    content = [f"{fmt(scale)} 0 0 {fmt(-scale)} 0 {fmt(page_points)} cm",
+               f"{rgb(variant['back'])} rg 0 0 {size} {size} re f"]
+    shadings = {}
+    for i, (region, kind, start, end, c1, c2) in enumerate(gradient_fills(variant, size)):
+        content.append("q")
+        content.append(shapes + "\nW n")
+        if region:
+            content.append(" ".join(f"{fmt(px)} {fmt(py)} {'m' if j == 0 else 'l'}"
+                                    for j, (px, py) in enumerate(region)) + " h W n")
+        if kind == "solid":
+            content.append(f"{rgb(c1)} rg 0 0 {size} {size} re f")
+        else:
+            function = f"<< /FunctionType 2 /Domain [0 1] /C0 [{rgb(c1)}] /C1 [{rgb(c2)}] /N 1 >>"
+            if kind == "linear":
+                coords = f"[{fmt(start[0])} {fmt(start[1])} {fmt(end[0])} {fmt(end[1])}]"
+                shadings[f"Sh{i}"] = (f"<< /ShadingType 2 /ColorSpace /DeviceRGB /Coords {coords} "
+                                      f"/Function {function} /Extend [true true] >>")
+            else:
+                coords = f"[{fmt(start[0])} {fmt(start[1])} 0 {fmt(start[0])} {fmt(start[1])} {fmt(end)}]"
+                shadings[f"Sh{i}"] = (f"<< /ShadingType 3 /ColorSpace /DeviceRGB /Coords {coords} "
+                                      f"/Function {function} /Extend [true true] >>")
+            content.append(f"/Sh{i} sh")
+        content.append("Q")
+
+    xobjects = {}
+    if variant["embed"]:
+        offset, width = embed_geometry(size)
+        jpeg = embed_jpeg(variant["embed"])
+        with Image.open(io.BytesIO(jpeg)) as img:
+            px_w, px_h = img.size
+        xobjects["Im0"] = (f"<< /Type /XObject /Subtype /Image /Width {px_w} /Height {px_h} "
+                           f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg)} >>", jpeg)
+        # Images draw in a unit square with y up; undo the page flip for it
+        content.append(f"q {fmt(width)} 0 0 {fmt(-width)} {fmt(offset)} {fmt(offset + width)} cm /Im0 Do Q")
+
+    stream = zlib.compress('\n'.join(content).encode('ascii'))
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>")
+    resources = []
+    next_id = 5
+    shading_refs = []
+    for name in shadings:
+        shading_refs.append(f"/{name} {next_id} 0 R")
+        next_id += 1
+    xobject_refs = []
+    for name in xobjects:
+        xobject_refs.append(f"/{name} {next_id} 0 R")
+        next_id += 1
+    if shading_refs:
+        resources.append(f"/Shading << {' '.join(shading_refs)} >>")
+    if xobject_refs:
+        resources.append(f"/XObject << {' '.join(xobject_refs)} >>")
+    objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_points} {page_points}] "
+                   f"/Resources << {' '.join(resources)} >> /Contents 4 0 R >>".encode('ascii'))
+    objects.append(f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode('ascii')
+                   + stream + b"\nendstream")
+    for shading in shadings.values():
+        objects.append(shading.encode('ascii'))
+    for header, data in xobjects.values():
+        objects.append(header.encode('ascii') + b"\nstream\n" + data + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode('ascii') + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('ascii')
+    out += ''.join(f"{o:010d} 00000 n \n" for o in offsets).encode('ascii')
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('ascii')
+    return bytes(out)
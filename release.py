@@ -0,0 +1,214 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "PyYAML", "Pillow", "rjsmin", "rcssmin", "brotli" ]
+# ///
+
+import os
+import re
+import glob
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+
+import brotli
+import rcssmin
+import rjsmin
+
+import build
+import timing
+from timing import tracer
+
+OUTPUT_DIR = 'dist'
+ASSETS_DIR = 'assets'   # Inside OUTPUT_DIR; every file in it is content-hashed and immutable
+MANIFEST_FILE = 'asset-manifest.json'
+MANIFEST_VERSION = 1
+HASH_LENGTH = 10
+# Fingerprinted in this order, so JS can refer to hashed JSON and CSS
+JSON_ASSETS = ('site-data.json', 'gallery-data.json', 'search-index.json', 'gallery/*.json')
+STYLE_ASSETS = ('css/*.css',)
+SCRIPT_ASSETS = ('js/*.js',)
+# Linked into the output as they are; images are already compressed
+STATIC_DIRS = ('images', 'derived')
+# Served at the root under their own names; sw.js must be, to control the whole site
+PAGES = ('index.html', 'sw.js')
+# Netlify / Cloudflare Pages format; other hosts need the equivalent configuration
+HEADERS = f"""/{ASSETS_DIR}/*
+  Cache-Control: public, max-age=31536000, immutable
+/*.html
+  Cache-Control: no-cache
+/sw.js
+  Cache-Control: no-cache
+/
+  Cache-Control: no-cache
+"""
+
+def minify(path, text):
+    """Minifies JSON, CSS and JS; HTML is left alone (collection descriptions rely on its whitespace)."""
+    ext = os.path.splitext(path)[1]
+    if ext == '.json':
+        return json.dumps(json.loads(text), separators=(',', ':'), ensure_ascii=False)
+    if ext == '.css':
+        return rcssmin.cssmin(text)
+    if ext == '.js':
+        return rjsmin.jsmin(text)
+    return text
+
+def rewrite_references(text, mapping):
+    """Replaces every quoted reference to a logical asset path with its hashed path."""
+    if not mapping:
+        return text
+    names = '|'.join(re.escape(name) for name in sorted(mapping, key=len, reverse=True))
+    return re.sub(rf'(["\'`])({names})\1', lambda m: m.group(1) + mapping[m.group(2)] + m.group(1), text)
+
+def hashed_path(path, data):
+    """assets/<path with / as ->.<content hash>.<ext>, e.g. css/style.css -> assets/css-style.1a2b3c4d5e.css."""
+    stem, ext = os.path.splitext(path)
+    return f"{ASSETS_DIR}/{stem.replace('/', '-')}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+def write_bytes_if_changed(path, data):
+    """Writes data unless the file already holds exactly that. Returns True if written."""
+    if os.path.exists(path) and os.path.getsize(path) == len(data):
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+def write_compressed(path, data, immutable=False):
+    """
+    Writes path plus its .gz and .br siblings; returns their sizes. Hashed (immutable)
+    files that already exist with both siblings are not compressed again.
+    """
+    if immutable and all(os.path.exists(path + ext) for ext in ('', '.gz', '.br')):
+        return os.path.getsize(path + '.gz'), os.path.getsize(path + '.br')
+    compressed = gzip.compress(data, 9, mtime=0), brotli.compress(data, quality=11)
+    write_bytes_if_changed(path, data)
+    write_bytes_if_changed(path + '.gz', compressed[0])
+    write_bytes_if_changed(path + '.br', compressed[1])
+    return len(compressed[0]), len(compressed[1])
+
+def link_tree(source_dir, output_dir):
+    """
+    Mirrors source_dir into output_dir with hard links (copies across file systems),
+    skipping files whose size and mtime already match and removing files that are gone.
+    Returns the number of files linked or copied.
+    """
+    linked = 0
+    wanted = set()
+    for root, _, files in os.walk(source_dir):
+        for name in files:
+            source = os.path.join(root, name)
+            target = os.path.join(output_dir, os.path.relpath(source, source_dir))
+            wanted.add(target)
+            stat = os.stat(source)
+            if os.path.exists(target):
+                existing = os.stat(target)
+                if existing.st_size == stat.st_size and existing.st_mtime_ns == stat.st_mtime_ns:
+                    continue
+                os.remove(target)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+            linked += 1
+    for root, _, files in os.walk(output_dir):
+        for name in files:
+            if os.path.join(root, name) not in wanted:
+                os.remove(os.path.join(root, name))
+    return linked
+
+def collect_assets():
+    """The logical asset paths that exist, in fingerprinting order."""
+    paths = []
+    for pattern in JSON_ASSETS + STYLE_ASSETS + SCRIPT_ASSETS:
+        paths.extend(sorted(p.replace(os.sep, '/') for p in glob.glob(pattern)))
+    return paths
+
+def bundle_assets(output_dir):
+    """
+    Minifies, fingerprints and precompresses every asset, then rewrites the pages to
+    point at the hashed names. Returns the manifest {logical path: entry}.
+    """
+    mapping = {}
+    assets = {}
+    for path in collect_assets():
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        data = rewrite_references(minify(path, source), mapping).encode('utf-8')
+        mapping[path] = hashed_path(path, data)
+        gz, br = write_compressed(os.path.join(output_dir, mapping[path]), data, immutable=True)
+        assets[path] = {"file": mapping[path], "source_bytes": len(source.encode('utf-8')),
+                        "bytes": len(data), "gzip_bytes": gz, "br_bytes": br}
+
+    for page in PAGES:
+        if not os.path.exists(page):
+            print(f"Warning: '{page}' not found; run build.py first.")
+            continue
+        with open(page, 'r', encoding='utf-8') as f:
+            source = f.read()
+        data = rewrite_references(source, mapping).encode('utf-8')
+        gz, br = write_compressed(os.path.join(output_dir, page), data)
+        assets[page] = {"file": page, "source_bytes": len(source.encode('utf-8')),
+                        "bytes": len(data), "gzip_bytes": gz, "br_bytes": br}
+
+    # Drop hashed files from earlier releases
+    keep = {os.path.join(output_dir, entry["file"]) + ext for entry in assets.values() for ext in ('', '.gz', '.br')}
+    for file in glob.glob(os.path.join(output_dir, ASSETS_DIR, '*')):
+        if file not in keep:
+            os.remove(file)
+    return assets
+
+def print_report(assets):
+    print(f"\n{'asset':<34} {'source':>9} {'minified':>9} {'gzip':>9} {'brotli':>9}")
+    totals = [0, 0, 0, 0]
+    for path, entry in assets.items():
+        sizes = (entry["source_bytes"], entry["bytes"], entry["gzip_bytes"], entry["br_bytes"])
+        totals = [t + s for t, s in zip(totals, sizes)]
+        print(f"{path:<34} " + ' '.join(f"{s / 1e3:>7.1f}KB" for s in sizes))
+    print(f"{'total':<34} " + ' '.join(f"{s / 1e3:>7.1f}KB" for s in totals))
+
+def release(output_dir=OUTPUT_DIR, run_build=True):
+    """
+    Builds the site, then writes a deployable copy to output_dir: minified, content-hashed
+    JSON/CSS/JS under assets/ with .gz and .br siblings, index.html rewritten to use them,
+    the image directories hard-linked, asset-manifest.json and cache headers.
+    """
+    if run_build:
+        with tracer.stage("build"):
+            build.run_build()
+
+    print(f"\nWriting release to '{output_dir}/'...")
+    with tracer.stage("assets") as span:
+        assets = bundle_assets(output_dir)
+        span["items"] = len(assets)
+        span["bytes_written"] = sum(e["bytes"] + e["gzip_bytes"] + e["br_bytes"] for e in assets.values())
+
+    with tracer.stage("static") as span:
+        for directory in STATIC_DIRS:
+            target = os.path.join(output_dir, directory)
+            if os.path.isdir(directory):
+                span["items"] += link_tree(directory, target)
+            elif os.path.isdir(target):
+                shutil.rmtree(target)
+
+    manifest = {"version": MANIFEST_VERSION, "assets": assets}
+    write_bytes_if_changed(os.path.join(output_dir, MANIFEST_FILE), json.dumps(manifest, indent=1).encode('utf-8'))
+    write_bytes_if_changed(os.path.join(output_dir, '_headers'), HEADERS.encode('utf-8'))
+    print_report(assets)
+    print(f"\nRelease written to '{output_dir}/' with manifest '{MANIFEST_FILE}'.")
+    return manifest
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the site and write a minified, fingerprinted, precompressed release.")
+    parser.add_argument('--output', default=OUTPUT_DIR, help="release directory (default: %(default)s)")
+    parser.add_argument('--no-build', action='store_true', help="bundle the current outputs without running build.py")
+    timing.add_arguments(parser)
+    args = parser.parse_args()
+    timing.configure(args, "release")
+    release(args.output, run_build=not args.no_build)
+    tracer.report()
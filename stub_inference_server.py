@@ -0,0 +1,125 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "qrcode[pil]", "numpy" ]
+# ///
+
+import io
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from qr_engine import make_variant, encode, render_image
+
+class StubInference:
+    """
+    Behaves like a rate-limited inference endpoint: a cold start answered with 503 and
+    estimated_time, 429 with Retry-After above `rate` requests per second, optional
+    random 500s, and a fixed latency. Successful calls return a plain QR code PNG of
+    the requested content, so outputs also pass verify_qr.py.
+    """
+
+    def __init__(self, latency=0.5, rate=1.0, cold_start=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.rate = rate
+        self.ready_at = time.monotonic() + cold_start
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.recent = deque()
+        self.lock = threading.Lock()
+        self.counts = {"200": 0, "429": 0, "500": 0, "503": 0}
+
+    def admit(self):
+        """Returns (status, headers, body) for a rejected request, or None to serve it."""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.ready_at:
+                self.counts["503"] += 1
+                return HTTPStatus.SERVICE_UNAVAILABLE, {}, {"error": "Model is loading",
+                                                           "estimated_time": round(self.ready_at - now, 2)}
+            while self.recent and now - self.recent[0] >= 1.0:
+                self.recent.popleft()
+            if self.rate and len(self.recent) >= self.rate:
+                self.counts["429"] += 1
+                wait = max(1, round(1.0 - (now - self.recent[0])))
+                return HTTPStatus.TOO_MANY_REQUESTS, {"Retry-After": str(wait)}, {"error": "Rate limit reached"}
+            self.recent.append(now)
+            if self.random.random() < self.failure_rate:
+                self.counts["500"] += 1
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {}, {"error": "Internal error"}
+            self.counts["200"] += 1
+            return None
+
+    def generate(self, request):
+        time.sleep(self.latency)
+        content = request.get("parameters", {}).get("qr_code_content") or request.get("inputs", "")
+        image = render_image(encode(content), make_variant("stub.png", "Square", "Solid", (0, 0, 0)))
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG')
+        return buffer.getvalue()
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    stub = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, headers, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {}, {"error": "Invalid JSON"})
+        rejection = self.stub.admit()
+        if rejection:
+            return self.send_json(*rejection)
+        data = self.stub.generate(request)
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def serve(host='127.0.0.1', port=8001, **options):
+    """Serves the stub until interrupted, then prints how many requests got each status."""
+    StubRequestHandler.stub = stub = StubInference(**options)
+    server = ThreadingHTTPServer((host, port), StubRequestHandler)
+    server.daemon_threads = True
+    print(f"Stub inference server on http://{host}:{port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Responses: {stub.counts}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local stand-in for the AI QR inference API, for testing the client.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds per generated image (default: %(default)s)")
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help="requests per second before answering 429 (0 = unlimited, default: %(default)s)")
+    parser.add_argument('--cold-start', type=float, default=0.0,
+                        help="seconds of 503 'model loading' answers after startup (default: %(default)s)")
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help="share of requests answered with a random 500 (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=None, help="seed for the random failures")
+    args = parser.parse_args()
+    serve(args.host, args.port, latency=args.latency, rate=args.rate, cold_start=args.cold_start,
+          failure_rate=args.failure_rate, seed=args.seed)
@@ -0,0 +1,182 @@
+// Generated by build.py from sw.template.js and the files it lists; edit the template instead.
+// Keeps the gallery usable on a poor or missing connection: the app shell is precached on
+// install, and JSON and images are served stale-while-revalidate. Images keep their URLs
+// when a painting is re-shot, so their cached copies are refreshed in the background too.
+
+const CACHE_VERSION = '$version';
+const SHELL_CACHE = 'gallery-shell-' + CACHE_VERSION;
+const IMAGE_CACHE = 'gallery-images';
+const IMAGE_CACHE_LIMIT = 400; // Entries kept; the oldest go first
+const SHELL = $shell;
+const GALLERY_DATA = 'gallery-data.json';
+const ATLAS_MAP = 'derived/atlas/atlas.json';
+const THUMBNAIL_FORMATS = ['webp', 'jpeg']; // Every browser with service workers decodes these
+const PRECACHE_CONCURRENCY = 2; // Thumbnail downloads in flight, so they leave room for the page
+
+const scope = new URL(self.registration.scope);
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(caches.open(SHELL_CACHE)
+        .then(cache => cache.addAll(SHELL))
+        .then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil(caches.keys()
+        .then(keys => Promise.all(keys
+            .filter(key => key.startsWith('gallery-shell-') && key !== SHELL_CACHE)
+            .map(key => caches.delete(key))))
+        .then(() => self.clients.claim()));
+});
+
+// app.js asks for the thumbnails once the page has loaded, so they never compete with it
+self.addEventListener('message', (event) => {
+    if (event.data === 'precache-thumbnails') {
+        event.waitUntil(precacheThumbnails().catch(error => console.error("Could not precache thumbnails:", error)));
+    }
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== scope.origin) return;
+
+    if (request.mode === 'navigate' && isPage(url)) {
+        // The pre-rendered page, with or without a deep link or query
+        event.respondWith(staleWhileRevalidate(event, scope.href, 'text/html'));
+    } else if (request.mode === 'navigate') {
+        // Other pages in scope, e.g. an image opened in its own tab, go to the network
+        return;
+    } else if (url.pathname.endsWith('.json')) {
+        event.respondWith(staleWhileRevalidate(event, request));
+    } else if (request.destination === 'image') {
+        event.respondWith(cachedImage(event));
+    } else {
+        event.respondWith(caches.match(request).then(cached => cached || fetch(request)));
+    }
+});
+
+function isPage(url) {
+    return url.pathname === scope.pathname || url.pathname === scope.pathname + 'index.html';
+}
+
+// Answers from the cache at once when it can, and refreshes the cache from the network
+// in the background; without a cached copy it waits for the network. Only successful
+// responses of the expected type (if given) are cached.
+async function staleWhileRevalidate(event, key, type) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(key, { ignoreSearch: true });
+    const update = fetch(event.request).then(response => {
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!response.ok || (type && !contentType.startsWith(type))) return response;
+        return cache.put(key, response.clone()).then(() => response);
+    });
+    if (!cached) return update;
+    event.waitUntil(update.catch(() => {}));
+    return cached;
+}
+
+// Like staleWhileRevalidate, for the image cache: it is capped, and offline a missing
+// variant falls back to a cached sibling
+async function cachedImage(event) {
+    const request = event.request;
+    const cache = await caches.open(IMAGE_CACHE);
+    const cached = await cache.match(request);
+    const update = fetch(request).then(async response => {
+        // A full cache only costs the offline copy
+        if (response.ok) {
+            await cache.put(request, response.clone()).catch(() => {});
+            await trimCache(cache);
+        }
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(update.catch(() => {}));
+        return cached;
+    }
+    try {
+        return await update;
+    } catch (error) {
+        const sibling = await cachedSibling(cache, request.url);
+        if (sibling) return sibling;
+        throw error;
+    }
+}
+
+// Drops the oldest entries beyond IMAGE_CACHE_LIMIT; cache.put moves a refreshed entry to the end
+async function trimCache(cache) {
+    const keys = await cache.keys();
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - IMAGE_CACHE_LIMIT)).map(key => cache.delete(key)));
+}
+
+// Offline, an image variant that was never fetched falls back to the widest cached
+// variant of the same painting: derived files are named <stem>-<width>.<ext>.
+async function cachedSibling(cache, url) {
+    const dash = url.lastIndexOf('-');
+    if (dash === -1 || !new URL(url).pathname.startsWith(scope.pathname + 'derived/')) return null;
+    const prefix = url.slice(0, dash + 1);
+    let best = null;
+    let bestWidth = 0;
+    for (const request of await cache.keys()) {
+        if (!request.url.startsWith(prefix)) continue;
+        const width = parseInt(request.url.slice(prefix.length));
+        if (width > bestWidth) {
+            best = request;
+            bestWidth = width;
+        }
+    }
+    return best ? cache.match(best) : null;
+}
+
+// The smallest file that shows each painting in the grid: its atlas sheet, else its
+// narrowest WebP or JPEG variant, else the image itself.
+async function thumbnailUrls() {
+    const shell = await caches.open(SHELL_CACHE);
+    const response = await shell.match(GALLERY_DATA) || await fetch(GALLERY_DATA);
+    const galleryData = await response.json();
+
+    const urls = new Set();
+    const tiled = new Set();
+    const atlas = await fetch(ATLAS_MAP).then(r => r.ok ? r.json() : null).catch(() => null);
+    if (atlas) {
+        Object.values(atlas.collections).forEach(collection => {
+            collection.sheets.forEach(sheet => urls.add(sheet.file));
+            Object.keys(collection.tiles).forEach(file => tiled.add(file));
+        });
+    }
+    Object.values(galleryData).forEach(collection => {
+        collection.paintings.forEach(painting => {
+            if (tiled.has(painting.file)) return;
+            const variants = (painting.variants || []).filter(v => THUMBNAIL_FORMATS.includes(v.format));
+            if (!variants.length) {
+                urls.add('images/' + painting.file);
+                return;
+            }
+            variants.sort((a, b) => a.width - b.width
+                || THUMBNAIL_FORMATS.indexOf(a.format) - THUMBNAIL_FORMATS.indexOf(b.format));
+            urls.add(variants[0].file);
+        });
+    });
+    return [...urls].map(url => new URL(url, scope).href);
+}
+
+async function precacheThumbnails() {
+    const cache = await caches.open(IMAGE_CACHE);
+    const cached = new Set((await cache.keys()).map(request => request.url));
+    // Thumbnails never push the cache past its limit, so they do not evict what was viewed
+    const queue = (await thumbnailUrls()).filter(url => !cached.has(url))
+        .slice(0, Math.max(0, IMAGE_CACHE_LIMIT - cached.size));
+
+    async function worker() {
+        while (queue.length) {
+            const url = queue.shift();
+            try {
+                const response = await fetch(url);
+                if (response.ok) await cache.put(url, response);
+            } catch (error) {
+                return; // Offline or out of quota; the next page load tries again
+            }
+        }
+    }
+    await Promise.all(Array.from({ length: PRECACHE_CONCURRENCY }, worker));
+}
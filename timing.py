@@ -0,0 +1,166 @@
+# /// script
+# requires-python = ">=3.11"
+# ///
+
+import os
+import json
+import time
+import pstats
+import cProfile
+import contextlib
+
+TIMINGS_DIR = os.path.join('.build-cache', 'timings')
+PROFILE_LINES = 20
+
+class Tracer:
+    """
+    Collects stage spans (timed blocks in this process) and item spans (one per
+    image, collection or QR variant, possibly timed in a worker process). Spans use
+    time.perf_counter(), which is system-wide, so worker and parent spans line up.
+    Recording is off unless configured; stage() then only measures its block.
+    """
+
+    def __init__(self):
+        self.name = "build"
+        self.enabled = False
+        self.profile_stage = None
+        self.top = 10
+        self.spans = []
+
+    @contextlib.contextmanager
+    def stage(self, name, **fields):
+        """
+        Times a block as one stage. Yields the span dict, so the block can add counts;
+        item() and items() add their items, bytes read and bytes written to it.
+        """
+        span = {"name": name, "kind": "stage", "pid": os.getpid(), "start": time.perf_counter(),
+                "items": 0, "bytes_read": 0, "bytes_written": 0, **fields}
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        if profiler:
+            profiler.enable()
+        try:
+            yield span
+        finally:
+            if profiler:
+                profiler.disable()
+                self.save_profile(name, profiler)
+            span["seconds"] = time.perf_counter() - span["start"]
+            if self.enabled:
+                self.spans.append(span)
+
+    def item(self, stage, name, start, seconds, bytes_read=0, bytes_written=0, pid=None, tid=0, steps=None, **fields):
+        """
+        Records one item of a stage and adds its bytes to the stage's totals. tid
+        places items run in threads on their own row of the process. steps are the
+        item's seconds per step (see StepTimer), also summed into the stage.
+        """
+        stage["items"] += 1
+        stage["bytes_read"] += bytes_read
+        stage["bytes_written"] += bytes_written
+        if steps:
+            fields["steps"] = steps
+            totals = stage.setdefault("steps", {})
+            for step, step_seconds in steps.items():
+                totals[step] = totals.get(step, 0.0) + step_seconds
+        if self.enabled:
+            self.spans.append({"name": name, "kind": "item", "stage": stage["name"], "pid": pid or os.getpid(),
+                               "tid": tid, "start": start, "seconds": seconds, "bytes_read": bytes_read,
+                               "bytes_written": bytes_written, **fields})
+
+    def items(self, stage, results, key="source"):
+        """Records worker result dicts (as returned through timed_call) as items of a stage."""
+        for r in results:
+            if "started" in r:
+                self.item(stage, r[key], r["started"], r["seconds"], r.get("bytes_read", 0),
+                          r.get("bytes_written", 0), pid=r["pid"], steps=r.get("steps"), status=r["status"])
+
+    def save_profile(self, stage, profiler):
+        os.makedirs(TIMINGS_DIR, exist_ok=True)
+        path = os.path.join(TIMINGS_DIR, f"{self.name}-{stage}.prof")
+        profiler.dump_stats(path)
+        print(f"\nProfile of stage '{stage}' written to {path} (this thread only; run pool stages with -j 1):")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(PROFILE_LINES)
+
+    def chrome_trace(self):
+        """The spans as Chrome trace events (chrome://tracing, Perfetto): one row per process or thread."""
+        origin = min(span["start"] for span in self.spans)
+        events = []
+        for span in self.spans:
+            args = {k: v for k, v in span.items() if k not in ("name", "kind", "pid", "tid", "start", "seconds")}
+            events.append({"name": span["name"], "cat": span["kind"], "ph": "X", "pid": span["pid"],
+                           "tid": span.get("tid", 0),
+                           "ts": round((span["start"] - origin) * 1e6), "dur": round(span["seconds"] * 1e6),
+                           "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def report(self):
+        """Writes <name>.json and <name>.trace.json and prints the stage table and slowest items."""
+        if not self.enabled or not self.spans:
+            return
+        os.makedirs(TIMINGS_DIR, exist_ok=True)
+        stages = [s for s in self.spans if s["kind"] == "stage"]
+        items = sorted((s for s in self.spans if s["kind"] == "item"), key=lambda s: -s["seconds"])
+        json_file = os.path.join(TIMINGS_DIR, f"{self.name}.json")
+        trace_file = os.path.join(TIMINGS_DIR, f"{self.name}.trace.json")
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump({"name": self.name, "stages": stages, "items": items}, f, indent=1)
+        with open(trace_file, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+        print(f"\n{'stage':<20} {'seconds':>8} {'items':>7} {'read':>10} {'written':>10}")
+        for s in stages:
+            print(f"{s['name']:<20} {s['seconds']:>8.3f} {s['items']:>7} "
+                  f"{s['bytes_read'] / 1e6:>8.1f}MB {s['bytes_written'] / 1e6:>8.1f}MB")
+        for s in stages:
+            if s.get("steps"):
+                print(f"  {s['name']}: " + ', '.join(f"{step} {seconds:.3f}s" for step, seconds in s["steps"].items())
+                      + " (summed over items)")
+        if items:
+            print(f"\nSlowest {min(self.top, len(items))} of {len(items)} items:")
+            for s in items[:self.top]:
+                print(f"  {s['seconds']:>7.3f}s  {s['stage']:<12} {s['name']}")
+        print(f"\nTimings written to {json_file} and {trace_file}.")
+
+tracer = Tracer()
+
+class StepTimer:
+    """
+    Sums the seconds a worker job spends in each named step, e.g. decode, resample
+    and encode; a job returns .steps in its result dict for tracer.items().
+    """
+
+    def __init__(self):
+        self.steps = {}
+
+    @contextlib.contextmanager
+    def __call__(self, step):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[step] = self.steps.get(step, 0.0) + time.perf_counter() - start
+
+def timed_call(func, *args):
+    """
+    Calls func(*args) and stamps the returned result dict with its start time and
+    process id, so items run in pool workers can be placed on the trace.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    result["started"] = start
+    result["pid"] = os.getpid()
+    return result
+
+def add_arguments(parser):
+    """Adds the shared --timings, --profile and --top options to a script's parser."""
+    parser.add_argument('--timings', action='store_true',
+                        help=f"record stage and item timings to '{TIMINGS_DIR}/' as JSON and a Chrome trace")
+    parser.add_argument('--profile', metavar='STAGE', help="run cProfile over one stage (implies --timings)")
+    parser.add_argument('--top', type=int, default=10, help="slowest items to list with --timings (default: %(default)s)")
+
+def configure(args, name):
+    """Enables the shared tracer from parsed arguments; name prefixes the report files."""
+    tracer.name = name
+    tracer.enabled = args.timings or bool(args.profile)
+    tracer.profile_stage = args.profile
+    tracer.top = args.top
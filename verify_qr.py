@@ -0,0 +1,282 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "qrcode[pil]", "numpy", "zxing-cpp" ]
+# ///
+
+import io
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import zxingcpp
+from PIL import Image, ImageFilter, ImageEnhance
+
+from qr_engine import URL
+from process_images import file_sha256, run_jobs
+
+QR_DIRS = ("ai-qr-codes", "qr-variations", "modern-qr", "qr-labels/codes")
+RASTER_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+VECTOR_EXTENSIONS = ('.svg', '.pdf')  # Not decoded; listed as unchecked in the report
+REPORT_FILE = "qr-scan-report.json"
+CACHE_FILE = os.path.join('.build-cache', 'qr-verify-cache.json')
+CANONICAL_WIDTH = 600  # Every degradation except downscale runs at this width
+
+# Degradation ladders, mildest first. Each step is one decode attempt; a variant's
+# score is the share of steps it survives. Bump VERIFY_VERSION when these change.
+VERIFY_VERSION = 1
+DEGRADATIONS = {
+    "downscale": (300, 200, 140, 100),    # width in px, as seen from further away
+    "blur": (1.0, 2.0, 3.0, 4.0),         # Gaussian radius in px
+    "jpeg": (40, 20, 10, 5),              # JPEG quality
+    "perspective": (0.1, 0.2, 0.3, 0.4),  # top edge shrunk by this share of the width
+    "contrast": (0.5, 0.3, 0.2, 0.12),    # contrast factor, washed out towards gray
+}
+
+def load_image(path):
+    """Loads an image as RGB, flattening transparency onto white, at the canonical width."""
+    with Image.open(path) as img:
+        img = img.convert('RGBA')
+    flat = Image.new('RGB', img.size, (255, 255, 255))
+    flat.paste(img, mask=img.getchannel('A'))
+    height = round(flat.height * CANONICAL_WIDTH / flat.width)
+    return flat.resize((CANONICAL_WIDTH, height), Image.LANCZOS)
+
+def perspective_coeffs(source, target):
+    """Solves the 8 PERSPECTIVE transform coefficients mapping target corners onto source corners."""
+    rows = []
+    for (x, y), (u, v) in zip(target, source):
+        rows.append([x, y, 1, 0, 0, 0, -u * x, -u * y])
+        rows.append([0, 0, 0, x, y, 1, -v * x, -v * y])
+    return np.linalg.solve(np.array(rows, dtype=np.float64), np.array(source, dtype=np.float64).ravel())
+
+def degrade(img, kind, level):
+    """Applies one degradation step to an RGB image."""
+    if kind == "downscale":
+        return img.resize((level, round(img.height * level / img.width)), Image.BILINEAR)
+    if kind == "blur":
+        return img.filter(ImageFilter.GaussianBlur(level))
+    if kind == "jpeg":
+        buffer = io.BytesIO()
+        img.save(buffer, 'JPEG', quality=level)
+        return Image.open(buffer)
+    if kind == "perspective":
+        # Pad first so the tilted code is not cropped, then pull the top corners inwards
+        w, h = img.size
+        pad = w // 5
+        padded = Image.new('RGB', (w + 2 * pad, h + 2 * pad), (255, 255, 255))
+        padded.paste(img, (pad, pad))
+        corners = [(pad, pad), (pad + w, pad), (pad + w, pad + h), (pad, pad + h)]
+        inset = level * w / 2
+        tilted = [(pad + inset, pad), (pad + w - inset, pad), (pad + w, pad + h), (pad, pad + h)]
+        return padded.transform(padded.size, Image.PERSPECTIVE, tuple(perspective_coeffs(corners, tilted)),
+                                Image.BILINEAR, fillcolor=(255, 255, 255))
+    if kind == "contrast":
+        return ImageEnhance.Contrast(img).enhance(level)
+    raise ValueError(f"Unknown degradation '{kind}'")
+
+def decode(img):
+    """Returns the text of the first QR code found in the image, or None."""
+    barcode = zxingcpp.read_barcode(img, formats=zxingcpp.BarcodeFormat.QRCode)
+    return barcode.text if barcode else None
+
+def verify_one(path, expected):
+    """
+    Decodes one image clean and under every degradation step. Runs in a worker
+    process; returns a result dict instead of raising.
+    """
+    start = time.perf_counter()
+    result = {"file": path, "expected": expected}
+    try:
+        img = load_image(path)
+        decoded = decode(img)
+        result["decoded"] = decoded
+        if decoded is None:
+            result.update(status="unreadable", score=0.0, breaks={})
+        elif decoded != expected:
+            result.update(status="wrong-payload", score=0.0, breaks={})
+        else:
+            passed = total = 0
+            breaks = {}
+            for kind, levels in DEGRADATIONS.items():
+                for level in levels:
+                    total += 1
+                    if decode(degrade(img, kind, level)) == expected:
+                        passed += 1
+                    elif kind not in breaks:
+                        breaks[kind] = level  # Mildest step that failed
+            result.update(status="ok", score=round(100 * passed / total, 1), breaks=breaks)
+    except Exception as e:
+        result.update(status="failed", score=0.0, breaks={}, error=str(e))
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def expected_payloads(directory):
+    """
+    Maps each file in a render_variants output directory to its payload, from
+    manifest.json when present. Files without an entry are expected to carry URL.
+    """
+    manifest_file = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    base = manifest.get("url") or URL
+    return {file: entry["variant"].get("url", base) for file, entry in manifest.get("variants", {}).items()}
+
+def collect_images(directories):
+    """
+    Returns (jobs, unchecked): (path, expected payload) for every raster image in the
+    directories, and the paths of vector outputs, which zxing-cpp cannot read.
+    """
+    jobs = []
+    unchecked = []
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        payloads = expected_payloads(directory)
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name).replace(os.sep, '/')
+            if name.lower().endswith(RASTER_EXTENSIONS):
+                jobs.append((path, payloads.get(name, URL)))
+            elif name.lower().endswith(VECTOR_EXTENSIONS):
+                unchecked.append(path)
+    return jobs, unchecked
+
+def load_cache():
+    """Loads cached results keyed by image content, payload and VERIFY_VERSION."""
+    if os.path.exists(CACHE_FILE):
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get("version") == VERIFY_VERSION:
+            return cache
+    return {"version": VERIFY_VERSION, "results": {}}
+
+def save_cache(cache):
+    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+
+def reject(results, threshold):
+    """
+    Marks results scoring below threshold as rejected and returns their files. The
+    files stay in place, since the generators own their output directories.
+    """
+    for r in results:
+        r["rejected"] = r["score"] < threshold
+    return [r["file"] for r in results if r["rejected"]]
+
+def prune(rejected):
+    """
+    Deletes rejected variants that their directory's manifest.json (see
+    qr_engine.render_variants) records, moving their entries to its "rejected" map
+    with their cache key, so the generator skips them until their description
+    changes. Files no manifest records are left alone. Returns the pruned files.
+    """
+    by_directory = {}
+    for file in rejected:
+        by_directory.setdefault(os.path.dirname(file), []).append(os.path.basename(file))
+    pruned = []
+    for directory, names in by_directory.items():
+        manifest_file = os.path.join(directory, 'manifest.json')
+        if not os.path.exists(manifest_file):
+            continue
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        for name in names:
+            entry = manifest["variants"].pop(name, None)
+            if entry is None:
+                continue
+            manifest.setdefault("rejected", {})[name] = entry["key"]
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+            pruned.append(path.replace(os.sep, '/'))
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+    return pruned
+
+def verify(directories=QR_DIRS, workers=None, force=False, report_file=REPORT_FILE, reject_below=None,
+           prune_rejected=False):
+    """
+    Decodes every generated QR image under simulated degradations across a process
+    pool and writes a ranked robustness report, optionally marking variants scoring
+    below reject_below as rejected in it and, with prune_rejected, pruning them.
+    Results of unchanged images are reused from the cache. Returns the ranked results.
+    """
+    start = time.perf_counter()
+    jobs, unchecked = collect_images(directories)
+    cache = load_cache()
+    keys = {}
+    results = []
+    pending = []
+    for path, expected in jobs:
+        keys[path] = f"{file_sha256(path)}:{expected}"
+        cached = cache["results"].get(keys[path])
+        if cached and not force:
+            results.append({"file": path, **cached, "seconds": 0.0})
+        else:
+            pending.append((path, expected))
+
+    workers = workers or os.cpu_count() or 1
+    print(f"Verifying {len(pending)} of {len(jobs)} image(s) with {min(workers, max(len(pending), 1))} worker(s)...")
+    for r in run_jobs(verify_one, pending, workers):
+        results.append(r)
+        if r["status"] != "failed":
+            cache["results"][keys[r["file"]]] = {k: v for k, v in r.items() if k not in ("file", "seconds")}
+    save_cache(cache)
+
+    results.sort(key=lambda r: (-r["score"], r["file"]))
+    rejected = reject(results, reject_below) if reject_below is not None else []
+    pruned = prune(rejected) if prune_rejected else []
+    report = {
+        "version": VERIFY_VERSION,
+        "degradations": DEGRADATIONS,
+        "reject_below": reject_below,
+        "rejected": rejected,
+        "pruned": pruned,
+        "unchecked": unchecked,
+        "results": [{"rank": i + 1, **{k: v for k, v in r.items() if k != "seconds"}}
+                    for i, r in enumerate(results)]
+    }
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+
+    for i, r in enumerate(results, 1):
+        weakest = ', '.join(f"{kind}@{level}" for kind, level in r["breaks"].items()) or '-'
+        line = f"  {i:3d}. {r['score']:5.1f}  {r['status']:<13} {r['file']}  breaks: {weakest}"
+        if r.get("rejected"):
+            line += "  REJECTED"
+        if r.get("error"):
+            line += f"  ({r['error']})"
+        print(line)
+
+    if reject_below is not None:
+        print(f"\nRejected {len(rejected)} variant(s) scoring below {reject_below}; listed under \"rejected\" in {report_file}.")
+    if prune_rejected:
+        print(f"Pruned {len(pruned)} of them; their generators skip them until they change.")
+    if unchecked:
+        print(f"\n{len(unchecked)} SVG/PDF file(s) not checked (only raster images are decoded); "
+              f"listed under \"unchecked\" in {report_file}.")
+
+    readable = sum(r["status"] == "ok" for r in results)
+    print(f"\nDone in {time.perf_counter() - start:.2f}s: {readable} of {len(results)} readable. "
+          f"Report written to {report_file}.")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check that generated QR codes still scan under simulated degradations.")
+    parser.add_argument('directories', nargs='*', default=QR_DIRS,
+                        help="directories of QR images (default: %(default)s)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="re-verify images whose result is cached")
+    parser.add_argument('--report', default=REPORT_FILE, help="report file (default: %(default)s)")
+    parser.add_argument('--reject-below', type=float, default=None, metavar='SCORE',
+                        help="mark variants scoring below SCORE (0-100) as rejected in the report")
+    parser.add_argument('--prune', action='store_true',
+                        help="delete rejected variants and have their generator skip them until they change")
+    args = parser.parse_args()
+    if args.prune and args.reject_below is None:
+        parser.error("--prune needs --reject-below")
+    verify(args.directories, args.workers, args.force, args.report, args.reject_below, args.prune)
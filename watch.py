@@ -0,0 +1,257 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [ "PyYAML", "Pillow", "watchdog" ]
+# ///
+
+import os
+import time
+import argparse
+import threading
+from email.utils import formatdate
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+from watchdog.observers import Observer
+from watchdog.events import (FileSystemEventHandler, EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED,
+                             EVENT_TYPE_MOVED, EVENT_TYPE_DELETED, EVENT_TYPE_CLOSED)
+
+import build
+import process_images
+
+DEBOUNCE_SECONDS = 0.15
+# Events that change a file; opened/closed_no_write come from plain reads (the server's and the
+# build's own), which would otherwise trigger a rebuild and reload loop
+CHANGE_EVENTS = {EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_MOVED, EVENT_TYPE_DELETED, EVENT_TYPE_CLOSED}
+RELOAD_PATH = '/__livereload'
+RELOAD_SCRIPT = f"""<script>
+new EventSource('{RELOAD_PATH}').onmessage = () => location.reload();
+</script>
+"""
+# Files watched at the top level; everything under images/, css/ and js/ is watched too
+TOP_LEVEL_FILES = {'site.yaml', 'gallery-data.json', 'index.template.html', 'sw.template.js'}
+# Outputs written by the rebuild itself, which must not trigger another rebuild
+BUILD_OUTPUTS = {build.OUTPUT_FILE, build.SITE_OUTPUT_FILE, build.INDEX_FILE, build.SEARCH_INDEX_FILE, build.SW_FILE}
+# Served instead of sw.js, whose caches would hide edits from live reload; it removes
+# any worker installed earlier (e.g. by previewing a release on the same port)
+SW_PATH = f'/{build.SW_FILE}'
+DEV_SERVICE_WORKER = b"""self.addEventListener('install', () => self.skipWaiting());
+self.addEventListener('activate', () => self.registration.unregister());
+"""
+
+class LiveReload:
+    """Tracks a reload generation that connected browsers wait on."""
+
+    def __init__(self):
+        self.generation = 0
+        self.condition = threading.Condition()
+
+    def trigger(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Blocks until the generation moves past `generation`; returns the current one."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler with ETag revalidation, live-reload injection and an SSE endpoint."""
+
+    live_reload = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def end_headers(self):
+        self.send_header('Cache-Control', 'no-cache')
+        super().end_headers()
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            return self.serve_reload_events()
+        if self.path.split('?', 1)[0] == SW_PATH:
+            return self.serve_dev_service_worker()
+        super().do_GET()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = os.path.join(path, 'index.html')
+            if not self.path.split('?', 1)[0].endswith('/') or not os.path.isfile(index):
+                return super().send_head()
+            path = index
+        if not os.path.isfile(path):
+            return super().send_head()
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return None
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        if path.endswith('.html'):
+            body = body.replace(b'</body>', RELOAD_SCRIPT.encode('utf-8') + b'</body>', 1)
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Last-Modified', formatdate(stat.st_mtime, usegmt=True))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        if self.command == 'HEAD':
+            return None
+        self.wfile.write(body)
+        return None
+
+    def serve_dev_service_worker(self):
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/javascript')
+        self.send_header('Content-Length', str(len(DEV_SERVICE_WORKER)))
+        self.end_headers()
+        self.wfile.write(DEV_SERVICE_WORKER)
+
+    def serve_reload_events(self):
+        """Holds a text/event-stream open and sends a message on every rebuild."""
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        generation = self.live_reload.generation
+        try:
+            while True:
+                current = self.live_reload.wait(generation, timeout=15)
+                # Comment lines keep idle connections from being dropped
+                self.wfile.write(b'data: reload\n\n' if current != generation else b': ping\n\n')
+                self.wfile.flush()
+                generation = current
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+class ChangeCollector(FileSystemEventHandler):
+    """Collects changed paths and flushes them once events stop arriving for DEBOUNCE_SECONDS."""
+
+    def __init__(self, on_flush):
+        self.on_flush = on_flush
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.timer = None
+
+    def on_any_event(self, event):
+        if event.event_type not in CHANGE_EVENTS or (event.is_directory and event.event_type == EVENT_TYPE_MODIFIED):
+            return
+        paths = [event.src_path] + ([event.dest_path] if getattr(event, 'dest_path', '') else [])
+        with self.lock:
+            self.pending.update(Path(os.path.relpath(p)) for p in paths)
+            if self.timer:
+                self.timer.cancel()
+            self.timer = threading.Timer(DEBOUNCE_SECONDS, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            paths, self.pending = self.pending, set()
+        if paths:
+            self.on_flush(paths)
+
+class Rebuilder:
+    """Maps a batch of changed paths onto the smallest rebuild that covers them."""
+
+    def __init__(self, live_reload, derivatives):
+        self.live_reload = live_reload
+        self.derivatives = derivatives
+        self.lock = threading.Lock()
+        self.output_mtimes = {}
+
+    def is_own_write(self, path):
+        """True if path is a build output whose mtime matches what the last rebuild wrote."""
+        return path in BUILD_OUTPUTS and path.exists() and self.output_mtimes.get(path) == path.stat().st_mtime_ns
+
+    def __call__(self, paths):
+        with self.lock:
+            start = time.perf_counter()
+            paths = {p for p in paths if not self.is_own_write(p)}
+            if not paths:
+                return
+            site_changed = build.SITE_CONFIG_FILE in paths
+            # Hand edits to gallery-data.json and template edits only re-render index.html and sw.js
+            page_changed = bool(paths & {build.OUTPUT_FILE, build.INDEX_TEMPLATE_FILE, build.SW_TEMPLATE_FILE})
+            collections = set()
+            images = set()
+            for p in paths:
+                if p.parts[0] == build.IMAGES_DIR.name and len(p.parts) >= 2:
+                    collections.add(p.parts[1])
+                    if len(p.parts) == 3 and process_images.is_image_name(p.name):
+                        images.add('/'.join(p.parts[1:]))
+
+            try:
+                if images and self.derivatives:
+                    process_images.generate_derivatives(only=sorted(images), workers=1)
+                if collections or site_changed or page_changed:
+                    build.run_build(collections_to_check=collections, site=site_changed)
+            except Exception as e:
+                print(f"Rebuild failed: {e}")
+                return
+            for output in BUILD_OUTPUTS:
+                if output.exists():
+                    self.output_mtimes[output] = output.stat().st_mtime_ns
+
+            self.live_reload.trigger()
+            changed = ', '.join(sorted(str(p) for p in paths))
+            print(f"[watch] {changed} -> reloaded in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+def watch(host='127.0.0.1', port=8000, derivatives=None):
+    """Runs an initial build, serves the site and rebuilds incrementally on every change."""
+    if derivatives is None:
+        derivatives = os.path.exists(os.path.join(process_images.DERIVED_DIR, 'manifest.json'))
+    build.run_build()
+
+    live_reload = LiveReload()
+    rebuilder = Rebuilder(live_reload, derivatives)
+    collector = ChangeCollector(rebuilder)
+    for output in BUILD_OUTPUTS:
+        if output.exists():
+            rebuilder.output_mtimes[output] = output.stat().st_mtime_ns
+
+    class TopLevelFilter(FileSystemEventHandler):
+        def on_any_event(self, event):
+            # Editors often save by writing a temporary file and renaming it over the original
+            names = {Path(event.src_path).name, Path(getattr(event, 'dest_path', '') or '').name}
+            if names & TOP_LEVEL_FILES:
+                collector.on_any_event(event)
+
+    observer = Observer()
+    observer.schedule(TopLevelFilter(), '.', recursive=False)
+    for directory in (build.IMAGES_DIR, Path('css'), Path('js')):
+        if directory.exists():
+            observer.schedule(collector, str(directory), recursive=True)
+    observer.start()
+
+    DevRequestHandler.live_reload = live_reload
+    server = ThreadingHTTPServer((host, port), DevRequestHandler)
+    server.daemon_threads = True
+    print(f"\nServing on http://{host}:{port}/ - watching for changes (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        observer.stop()
+        observer.join()
+        server.server_close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the site and rebuild incrementally on changes.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--derivatives', action=argparse.BooleanOptionalAction, default=None,
+                        help="regenerate responsive derivatives of changed images "
+                             "(default: only if derived/manifest.json exists)")
+    args = parser.parse_args()
+    watch(args.host, args.port, args.derivatives)